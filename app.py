@@ -1,13 +1,31 @@
-import os, json, time, random, re
-import pandas as pd
+import io, logging, os, time, random, re, uuid
+from concurrent.futures import wait
 import streamlit as st
+import streamlit.components.v1 as components
 from pathlib import Path
 import datetime as dt
+from engine import GAMES, Engine, small_talk_reply
+from history_store import ChatHistory, start_sweeper
+from metrics import METRICS
+from mood_store import LEGACY_USER
 
 # ---------- env & config ----------
 st.set_page_config(page_title="MannMitra (Prototype)", page_icon="💚", layout="wide")
+# full-script executions this session (fragment reruns don't pass through here)
+st.session_state["_script_runs"] = st.session_state.get("_script_runs", 0) + 1
+_RUN_T0 = time.perf_counter()
 APP_DIR = Path(__file__).parent
-os.makedirs(APP_DIR / "data", exist_ok=True)
+DATA_DIR = Path(os.getenv("MANNMITRA_DATA_DIR") or APP_DIR / "data")  # mood log, metrics, chat spill files
+os.makedirs(DATA_DIR, exist_ok=True)
+HISTORY_RING = int(os.getenv("MANNMITRA_HISTORY_RING", "40"))         # chat turns kept in memory per session
+CHAT_WINDOW = 20                                                       # messages rendered per "load earlier" page
+STREAM_REPLIES = os.getenv("MANNMITRA_STREAM", "1") == "1"            # render replies chunk by chunk
+METRICS_PORT = int(os.getenv("MANNMITRA_METRICS_PORT", "0"))          # serve /metrics on this port (0 = off)
+ADMIN_PANEL = os.getenv("MANNMITRA_ADMIN", "0") == "1"                # latency panel in the sidebar
+LAZY_INIT = os.getenv("MANNMITRA_LAZY_INIT", "1") == "1"              # import pandas / build the Gemini client on first use
+SINGLE_USER = os.getenv("MANNMITRA_SINGLE_USER", "0") == "1"          # one shared mood history, no per-browser ids
+if not LAZY_INIT:
+    import pandas  # noqa: F401  eager mode: pay for it at startup, as before
 
 # ---------- aesthetic CSS ----------
 st.markdown("""
@@ -47,13 +65,14 @@ def _apply_scroll_if_needed():
         )
 
 # ---------- helpers ----------
-def load_json_safe(rel_path: str, default: dict):
-    p = APP_DIR / rel_path
-    try:
-        with open(p, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return default
+def _end_run(kind: str = "full"):
+    """Record this script run's duration and refresh data/metrics.prom (at most every 5 s)."""
+    METRICS.observe(f"app.rerun.{kind}", time.perf_counter() - _RUN_T0)
+    METRICS.write(DATA_DIR / "metrics.prom", min_interval_s=5)
+
+def _rerun():
+    _end_run("interrupted")  # st.rerun() ends this run early
+    st.rerun()
 
 def pick_new(state_key: str, choices: list[str]) -> str:
     last = st.session_state.get(state_key)
@@ -74,110 +93,54 @@ GAME_AVG    = ["Nice effort — try once more, slow and steady.","Solid! One mor
 GAME_LOW    = ["Mind might be busy — a 30-sec breath can help.","It’s okay — reset with a breath and try again."]
 GAME_QUOTES = ["“Focus grows where attention goes.”","“Progress > perfection.”","“Storms pass; you stay.”"]
 
-# ---------- content files (safe defaults) ----------
-WHO5 = load_json_safe("content/who5.json", {
-    "items":[
-        "I have felt cheerful and in good spirits",
-        "I have felt calm and relaxed",
-        "I have felt active and vigorous",
-        "I woke up feeling fresh and rested",
-        "My daily life has been filled with things that interest me"
-    ]
-})
-EXERCISES = load_json_safe("content/exercises.json", {
-    "breathing_478":{"title":"4-7-8 Breathing","steps":["Inhale 4s","Hold 7s","Exhale 8s"],"cycles":3},
-    "grounding_54321":{"title":"5-4-3-2-1 Grounding","steps":["5 see","4 touch","3 hear","2 smell","1 taste"],"cycles":1}
-})
-HELPLINES = load_json_safe("content/helplines_in.json", {
-    "tele_manas":{"name":"Tele-MANAS","phone":"14416","alt":"1-800-891-4416"},
-    "kiran":{"name":"KIRAN","phone":"1800-599-0019"}
-})
-
-# ---------- extra exercises ----------
-MORE_EXERCISES = {
-    "box_breath":{"title":"Box Breathing","when":"Feeling anxious or heart racing; need a quick reset.",
-                  "what":"Inhale–Hold–Exhale–Hold for equal counts.","steps":["Inhale 4s","Hold 4s","Exhale 4s","Hold 4s"],"cycles":4},
-    "body_scan":{"title":"60-sec Body Scan","when":"Tense or restless; want to relax before sleep or study.",
-                 "what":"Move attention head to toe, relaxing each area.",
-                 "steps":["Head & face relax","Neck & shoulders soften","Chest & arms loosen","Stomach unclench","Legs feel heavy","Notice easy breathing"],"cycles":1},
-    "stop_skill":{"title":"STOP Skill","when":"Strong emotions or urge to react; need a pause.",
-                  "what":"DBT micro-skill: pause, breathe, observe, proceed.",
-                  "steps":["S—Stop","T—Take a slow breath","O—Observe body/thoughts","P—Proceed with one small helpful action"],"cycles":1}
-}
-
-# ---------- Gemini (optional) ----------
+# ---------- core engine (content, Gemini, cache, mood log; see engine.py) ----------
 api_key = st.secrets.get("GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY")
-client = None
-if api_key:
-    try:
-        from google import genai
-        client = genai.Client(api_key=api_key)
-    except Exception:
-        client = None
-
-SYSTEM = ("You are MannMitra, an empathetic, non-judgmental wellness companion for Indian youth. "
-          "Be supportive, reduce stigma. Offer gentle self-care (breathing, grounding, journaling). "
-          "Do not diagnose or prescribe. If crisis/self-harm hints appear, encourage immediate help and show helplines.")
-
-def gemini_reply(msg: str, lang: str = "English") -> str:
-    if not client:
-        if lang == "हिन्दी": return "मैं आपकी बात सुन रहा/रही हूँ। आप अकेले नहीं हैं।"
-        if lang == "Hinglish": return "Main sun raha/rahi hoon. Aap akelay nahi ho."
-        return "Thanks for sharing. I’m here to listen."
-    try:
-        lang_instr = {
-            "English":"Reply in natural, supportive English.",
-            "हिन्दी":"Reply in Hindi (Devanagari). Keep it warm and simple.",
-            "Hinglish":"Reply in Hindi written in Latin script (Hinglish). Example: 'main theek hoon'. Keep tone warm."
-        }[lang]
-        resp = client.models.generate_content(
-            model="gemini-2.5-flash-lite",
-            contents=[{"role":"user","parts":[{"text": f"{SYSTEM}\n{lang_instr}\nUser: {msg}"}]}]
-        )
-        return (resp.text or "").strip() or ("Main theek hoon." if lang!="English" else "I’m here for you.")
-    except Exception as e:
-        return f"(Temporary issue: {e}) I’m still here to support you."
-
-# ---------- risk classification ----------
-def classify_risk(text: str) -> int:
-    tl = text.lower()
-    urgent = any(x in tl for x in ["suicide","kill myself","end my life","jump off","hang myself","आत्महत्या","hurt myself badly"])
-    high   = any(x in tl for x in ["self harm","cut myself","can't go on","no reason to live","severe pain"])
-    if urgent: return 3
-    if high:   return 2
-    if client:
-        try:
-            r = client.models.generate_content(
-                model="gemini-2.5-flash-lite",
-                contents=[{"role":"user","parts":[{"text": "Classify self-harm risk: return only JSON {\"risk\":0|1|2|3}. Message: "+text}]}]
-            )
-            import json as _json
-            return int(_json.loads((r.text or "{}").strip()).get("risk",0))
-        except Exception:
-            pass
-    if any(x in tl for x in ["very sad","depressed","lonely","crying","hopeless","numb","empty"]): return 1
-    return 0
-
-# ---------- suggestion rules ----------
-SUGGESTION_RULES = [
-    {"id":"breathing_478","type":"exercise","title":"Try 4-7-8 breathing",
-     "match_any":[r"\banxious\b", r"\banxiety\b", r"\bstressed?\b", r"\boverwhelm", r"घबराहट", r"tension"]},
-    {"id":"grounding_54321","type":"exercise","title":"Try 5-4-3-2-1 grounding",
-     "match_any":[r"\boverthink", r"\bspiral", r"\bloop", r"\bracing thoughts\b"]},
-    {"id":"stroop","type":"game","title":"Play a 1-minute Focus game",
-     "match_any":[r"\bbored\b", r"\bdistract", r"\bcan.?t focus\b", r"\bprocrastinat"]},
-]
-def _regex_any(patterns, text): return any(re.search(p, text.lower()) for p in patterns)
-def choose_suggestion(user_text: str):
-    for r in SUGGESTION_RULES:
-        if _regex_any(r["match_any"], user_text): return {"source":"rules", **r}
-    if len(user_text.split()) >= 25:
-        return {"source":"rules","id":"breathing_478","type":"exercise","title":"Try 4-7-8 breathing"}
-    return None
+
+@st.cache_resource
+def get_engine(api_key: str | None) -> Engine:
+    """One engine per process, shared by every session thread."""
+    return Engine.from_env(APP_DIR, api_key)
+ENGINE = get_engine(api_key)
+
+@st.cache_resource
+def _setup_logging():
+    h = logging.StreamHandler()
+    h.setFormatter(logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s"))
+    log = logging.getLogger("mannmitra")
+    log.addHandler(h); log.setLevel(os.getenv("MANNMITRA_LOG_LEVEL", "INFO"))  # INFO logs prompt size per reply
+_setup_logging()
+
+@st.cache_resource
+def _metrics_endpoint(port: int):
+    return METRICS.serve(port) if port else None
+_metrics_endpoint(METRICS_PORT)
+CONTENT, LLM, LLM_CACHE = ENGINE.content, ENGINE.llm, ENGINE.cache
+WHO5, EXERCISES, HELPLINES = CONTENT.get("who5"), CONTENT.get("exercises"), CONTENT.get("helplines")
+
+# ---------- anonymous per-browser id (a cookie; never in the URL, where it would be shared with the link) ----------
+UID_COOKIE = "mannmitra_uid"
+def _user_id() -> str:
+    if SINGLE_USER: return LEGACY_USER
+    uid = st.session_state.get("user_id") or st.context.cookies.get(UID_COOKIE, "")
+    return uid if re.fullmatch(r"[0-9a-f]{32}", uid or "") else uuid.uuid4().hex
+st.session_state.user_id = USER_ID = _user_id()
+if not SINGLE_USER and st.context.cookies.get(UID_COOKIE) != USER_ID:
+    # cookies are read when the session connects, so this runs on a browser's first visit only;
+    # the script runs in a same-origin iframe and sets the cookie on the app page itself
+    components.html(f"<script>window.parent.document.cookie = '{UID_COOKIE}={USER_ID}; max-age=31536000; "
+                    "path=/; samesite=strict';</script>", height=0)
 
 # ---------- sidebar state ----------
 st.session_state.setdefault("quick_hide", False)
-st.session_state.setdefault("history", [])
+@st.cache_resource
+def _history_sweeper():
+    return start_sweeper(DATA_DIR / "history")  # hourly: drop spill files idle for a day
+_history_sweeper()
+if "history" not in st.session_state:
+    st.session_state.history = ChatHistory(DATA_DIR / f"history/{uuid.uuid4().hex}.jsonl", ring_size=HISTORY_RING)
+if "context" not in st.session_state:
+    st.session_state.context = ENGINE.new_context()  # running summary + recent turns for the reply prompt
+st.session_state.setdefault("chat_window", CHAT_WINDOW)
 st.session_state.setdefault("lang", "English")
 
 with st.sidebar:
@@ -186,24 +149,48 @@ with st.sidebar:
     if cA.button("🔒 Quick Hide"): st.session_state.quick_hide = True
     if cB.button("🔓 Unhide"):     st.session_state.quick_hide = False
     st.session_state.lang = st.radio("Reply language / भाषा", ["English","हिन्दी","Hinglish"], index=0)
-    st.caption("**AI status:** " + ("✅ Gemini enabled" if client else "⚠️ Fallback mode (no API key)"))
-
-    # recap
-    def build_recap(history, lang):
-        last_user = [t for r,t in history if r=="user"][-3:]
-        points = "\n".join(f"- {x}" for x in last_user) if last_user else "- (no details)"
-        base = f"Session recap ({lang}):\n{points}\n\nTiny plan for today:\n• 3 cycles 4-7-8\n• One kind line to yourself\n• 10-min walk"
-        if client and last_user:
-            try:
-                pr = f"{SYSTEM}\nSummarize in {lang} ≤60 words, then 3-bullet plan. Return plain text.\n" + "\n".join(last_user)
-                r = client.models.generate_content(model="gemini-2.5-flash-lite", contents=[{"role":"user","parts":[{"text":pr}]}])
-                return (r.text or "").strip() or base
-            except: return base
-        return base
+    gs = LLM.status()
+    if not gs["enabled"]:            ai_status = "⚠️ Fallback mode (no API key)"
+    elif gs["state"] == "open":      ai_status = f"⏸️ Gemini paused after repeated errors — fallback replies, retry in {gs['retry_in_s']:.0f}s"
+    elif gs["state"] == "half-open": ai_status = "🔄 Gemini recovering — next call is a trial"
+    else:                            ai_status = "✅ Gemini enabled"
+    st.caption("**AI status:** " + ai_status)
+    if gs["enabled"]:
+        st.caption(f"Gemini calls: {gs['calls']} · failures {gs['failures']} (timeouts {gs['timeouts']}) · skipped {gs['rejected']}")
+        cs = LLM_CACHE.stats()
+        st.caption(f"Response cache: {cs['hits']} hits · {cs['misses']} misses · {cs['items']} items")
+    ct = CONTENT.stats()
+    st.caption(f"Content: freshness check {ct['check_us']:.0f} µs/rerun · last full load "
+               f"{sum(e.get('load_ms', 0) for e in ct['entries'].values()):.1f} ms"
+               + "".join(f" · ⚠️ {n}: {e['error']}" for n, e in ct["entries"].items() if e.get("error")))
+    if st.session_state.get("last_turn"):
+        lt = st.session_state.last_turn
+        st.caption(f"Last reply: {lt.wall_s:.2f}s · saved {lt.saved_s:.2f}s by running checks in parallel"
+                   + (f" · first words after {lt.ttft_s:.2f}s" if lt.ttft_s is not None else "")
+                   + (f" · timed out: {', '.join(lt.timed_out)}" if lt.timed_out else "")
+                   + f" · prompt ≈{st.session_state.context.last_prompt_tokens} tokens")
+
+    # recap: written on a worker thread; clicking again on an unchanged chat reuses the result
     if st.button("📝 Generate recap"):
-        txt = build_recap(st.session_state.history, st.session_state.lang)
-        st.text_area("Recap preview", txt, height=160)
-        st.download_button("Download recap (.txt)", txt, file_name="recap.txt", mime="text/plain")
+        st.session_state.recap_key = ENGINE.start_recap(st.session_state.history, st.session_state.lang)
+        wait([ENGINE.recap_job(st.session_state.recap_key)], timeout=0.1)  # offline/cached recaps show at once
+    recap_job = ENGINE.recap_job(st.session_state.get("recap_key"))
+    recap_pending = recap_job is not None and not recap_job.done()
+
+    # only this fragment polls (once a second) while the recap is being written
+    @st.fragment(run_every=1 if recap_pending else None)
+    def recap_panel():
+        job = ENGINE.recap_job(st.session_state.get("recap_key"))
+        if job is None: return
+        if not job.done():
+            st.caption("⏳ Writing your recap… you can keep chatting.")
+        elif recap_pending:
+            st.rerun()  # one full rerun to stop the ticker
+        else:
+            txt = job.result()[0]
+            st.text_area("Recap preview", txt, height=160)
+            st.download_button("Download recap (.txt)", txt, file_name="recap.txt", mime="text/plain")
+    recap_panel()
 
 if st.session_state.quick_hide:
     st.markdown("### ✨ Screen hidden. This is your space — take a slow breath. When ready, unhide from the sidebar.")
@@ -220,40 +207,49 @@ with left:
     with st.container(border=True):
         st.subheader("Chat")
         st.markdown('<div class="chat-scroll">', unsafe_allow_html=True)
-        for role, text in st.session_state.history:
+        hist = st.session_state.history
+        if len(hist) > st.session_state.chat_window:
+            if st.button(f"⬆️ Load earlier ({len(hist) - st.session_state.chat_window} more)", key="chat_more"):
+                st.session_state.chat_window += CHAT_WINDOW
+                _rerun()
+        for role, text in hist.recent(st.session_state.chat_window):
             st.chat_message(role).markdown(text)
         st.markdown('</div>', unsafe_allow_html=True)
+        live = st.container()  # streaming mode draws the new turn here before the rerun
+
+        # risk notices live in state so they survive the rerun after each message
+        if st.session_state.get("risk_notice", 0) >= 2:
+            st.error(
+                "You deserve support. If you’re in danger, please reach out now.\n\n"
+                f"📞 {HELPLINES['tele_manas']['name']}: {HELPLINES['tele_manas']['phone']} / {HELPLINES['tele_manas'].get('alt','')}\n"
+                f"📞 {HELPLINES['kiran']['name']}: {HELPLINES['kiran']['phone']}"
+            )
+        elif st.session_state.get("risk_notice") == 1:
+            st.info("Thanks for sharing how heavy this feels. Would you like to tell me what made today hard?")
 
         user_msg = st.chat_input("Share what's on your mind… (EN/Hinglish/Hindi)")
         if user_msg:
-            plain = user_msg.strip().lower().rstrip("?.! ")
-            if plain in {"aap kaise ho","kaise ho","tum kaise ho"}:
-                if st.session_state.lang=="हिन्दी":
-                    st.session_state.history.append(("assistant","मैं ठीक हूँ — आपका शुक्रिया! आप कैसे हैं?"))
-                elif st.session_state.lang=="Hinglish":
-                    st.session_state.history.append(("assistant","Main theek hoon — shukriya! Aap kaise ho?"))
-                else:
-                    st.session_state.history.append(("assistant","I’m doing well — thanks for asking! How are you?"))
-                st.rerun()
-
-            st.session_state.history.append(("user", user_msg))
-            risk = classify_risk(user_msg)
-            if risk >= 2:
-                st.error(
-                    "You deserve support. If you’re in danger, please reach out now.\n\n"
-                    f"📞 {HELPLINES['tele_manas']['name']}: {HELPLINES['tele_manas']['phone']} / {HELPLINES['tele_manas'].get('alt','')}\n"
-                    f"📞 {HELPLINES['kiran']['name']}: {HELPLINES['kiran']['phone']}"
-                )
-                st.session_state.pop("suggestion", None)
-            elif risk == 1:
-                st.info("Thanks for sharing how heavy this feels. Would you like to tell me what made today hard?")
-                st.session_state["suggestion"] = choose_suggestion(user_msg)
+            canned = small_talk_reply(user_msg, st.session_state.lang)
+            if canned:
+                st.session_state.history.append("assistant", canned)
+                _rerun()
+
+            st.session_state.history.append("user", user_msg)
+            lang = st.session_state.lang
+            if STREAM_REPLIES:
+                live.chat_message("user").markdown(user_msg)
+                bubble = live.chat_message("assistant").empty()
+                turn, sug = ENGINE.chat_turn(user_msg, lang, render=bubble.write_stream, context=st.session_state.context)
+                if turn.suppressed: bubble.markdown(turn.reply)
             else:
-                st.session_state["suggestion"] = choose_suggestion(user_msg)
+                turn, sug = ENGINE.chat_turn(user_msg, lang, context=st.session_state.context)
+            st.session_state.risk_notice = turn.risk
+            st.session_state.last_turn = turn
+            if sug: st.session_state["suggestion"] = sug
+            else:   st.session_state.pop("suggestion", None)
 
-            bot = gemini_reply(user_msg, st.session_state.lang)
-            st.session_state.history.append(("assistant", bot))
-            st.rerun()
+            st.session_state.history.append("assistant", turn.reply)
+            _rerun()
 
     # Suggestion card
     if st.session_state.get("suggestion"):
@@ -261,7 +257,7 @@ with left:
         with st.container(border=True):
             st.markdown("#### Suggested for you")
             if sug["type"] == "exercise":
-                ex = EXERCISES.get(sug["id"], {})
+                ex = CONTENT.get("exercises_merged").get(sug["id"], {})
                 st.write(f"**{sug['title']}** · quick relief")
                 st.caption("A short, guided step you can try now.")
                 if st.button("Start now", key="sug_start_ex"):
@@ -282,30 +278,25 @@ with left:
                     st.session_state["show_stroop"] = True
                     st.session_state.pop("suggestion", None)
                     _set_scroll_anchor("games")
-                    st.rerun()
+                    _rerun()
                 if st.button("Not now", key="sug_skip_game"):
                     st.session_state.pop("suggestion", None)
 
+            elif sug["type"] == "game":  # riddles, gratitude
+                st.write(f"**{sug['title']}**")
+                st.caption(GAMES.get(sug["id"], {}).get("what", ""))
+                if st.button("Play now", key="sug_play_game"):
+                    if sug["id"] == "riddles": st.session_state["start_quiz"] = True
+                    st.session_state.pop("suggestion", None)
+                    _set_scroll_anchor("gratitude" if sug["id"] == "gratitude" else "games")
+                    _rerun()
+                if st.button("Not now", key="sug_skip_game2"):
+                    st.session_state.pop("suggestion", None)
+
     # Quick Exercises
     with st.container(border=True):
         st.subheader("Quick Exercises")
-        merged = {
-            "breathing_478": {
-                "title": EXERCISES.get("breathing_478", {}).get("title","4-7-8 Breathing"),
-                "when": "Anxious or restless; calm down in <2 min.",
-                "what": "Paced breathing that nudges the body toward calm.",
-                "steps": EXERCISES.get("breathing_478", {}).get("steps", ["Inhale 4s","Hold 7s","Exhale 8s"]),
-                "cycles": EXERCISES.get("breathing_478", {}).get("cycles", 3)
-            },
-            "grounding_54321": {
-                "title": EXERCISES.get("grounding_54321", {}).get("title","5-4-3-2-1 Grounding"),
-                "when": "Overthinking; come back to the present.",
-                "what": "Use your senses to anchor attention safely.",
-                "steps": EXERCISES.get("grounding_54321", {}).get("steps", ["5 see","4 touch","3 hear","2 smell","1 taste"]),
-                "cycles": 1
-            }
-        }
-        merged.update(MORE_EXERCISES)
+        merged = CONTENT.get("exercises_merged")
         for eid, meta in merged.items():
             with st.expander(f"🧩 {meta['title']}"):
                 st.caption(f"**When to use:** {meta['when']}")
@@ -328,12 +319,7 @@ with right:
             note = st.text_input("One line about today (optional)")
             submitted = st.form_submit_button("Save check-in")
         if submitted:
-            total = sum(who5_scores) * 4   # 0–100
-            row = pd.DataFrame([{"ts": int(time.time()), "score": total, "note": note}])
-            path = APP_DIR / "data/mood_log.csv"
-            if path.exists():
-                prev = pd.read_csv(path); row = pd.concat([prev, row], ignore_index=True)
-            row.to_csv(path, index=False)
+            total = ENGINE.save_checkin(who5_scores, note, user_id=USER_ID)   # 0–100
             st.success(f"Saved! Today’s WHO-5 score: {total}/100")
             if total < 40:
                 st.warning(pick_new("cheer_low", CHEER_LOW) + "\n\n" + pick_new("q_low", QUOTE_LOW))
@@ -345,24 +331,33 @@ with right:
     # Mood & Happiness — bar if 1 point, line if 2+
     with st.container(border=True):
         st.subheader("Mood & Happiness")
-        path = APP_DIR / "data/mood_log.csv"
-        if path.exists():
-            df = pd.read_csv(path)
-            df["date"] = pd.to_datetime(df["ts"], unit="s").dt.date
-            daily = df.groupby("date")["score"].mean().tail(14)
-            daily.index.name = "Date"
-            if len(daily) == 1:
-                st.caption("One entry so far — showing a bar. Add another day to see a line.")
-                st.bar_chart(daily, height=220)
+        with METRICS.time("mood.chart"):
+            recent = ENGINE.mood.daily(14, user_id=USER_ID)  # this user's daily rollup rows only
+            if recent:
+                import pandas as pd  # only runs with something to chart; cached in sys.modules after the first time
+                daily = pd.Series([m for _, m in recent], index=pd.Index([d for d, _ in recent], name="Date"), name="score")
+                if len(daily) == 1:
+                    st.caption("One entry so far — showing a bar. Add another day to see a line.")
+                    st.bar_chart(daily, height=220)
+                else:
+                    st.line_chart(daily, height=220)
+                today = dt.date.today()
+                past7 = {today - dt.timedelta(days=i) for i in range(7)}
+                wdf = daily[daily.index.isin(past7)]
+                happy_days = int((wdf >= 60).sum())
+                st.metric("Happy days this week", f"{happy_days}/7")
             else:
-                st.line_chart(daily, height=220)
-            today = dt.date.today()
-            past7 = {today - dt.timedelta(days=i) for i in range(7)}
-            wdf = daily[daily.index.isin(past7)]
-            happy_days = int((wdf >= 60).sum())
-            st.metric("Happy days this week", f"{happy_days}/7")
-        else:
-            st.info("No check-ins yet. Submit WHO-5 above to see your graphs.")
+                st.info("No check-ins yet. Submit WHO-5 above to see your graphs.")
+        if recent:
+            if st.button("⬇️ Export my check-ins", key="mood_export_btn"):
+                buf = io.BytesIO()
+                ENGINE.mood.export_parquet(buf, user_id=USER_ID)
+                st.session_state.mood_export = buf.getvalue()
+            if st.session_state.get("mood_export"):
+                st.download_button("Download (.parquet)", st.session_state.mood_export,
+                                   file_name="mannmitra_mood.parquet", mime="application/octet-stream")
+            if not SINGLE_USER:
+                st.caption("Check-ins are tied to this browser (a cookie) — clearing site data starts a new history.")
 
 # ---------- Games ----------
 st.divider()
@@ -383,6 +378,7 @@ elif "reaction_result_until" in st.session_state and now_ts >= st.session_state.
     st.session_state.pop("reaction_result_payload", None)
 
 st.session_state.setdefault("show_stroop", False)
+stroop_game = components.declare_component("stroop_game", path=str(APP_DIR / "components/stroop"))
 st.session_state.setdefault("show_quiz", False)
 
 # --- Game 1: Stroop ---
@@ -392,83 +388,48 @@ with st.container(border=True):
         if st.button("Play Stroop"):
             st.session_state.show_stroop = True
             _set_scroll_anchor("games")
-            st.rerun()
+            _rerun()
     else:
-        COLORS = ["RED","BLUE","GREEN","YELLOW","PURPLE","ORANGE"]
-        for k,v in {"stroop_trial":0,"stroop_score":0,"stroop_start":None,"stroop_item":None}.items():
-            st.session_state.setdefault(k,v)
-        def new_item():
-            return random.choice(COLORS), random.choice(COLORS)
-        if st.session_state.stroop_item is None: st.session_state.stroop_item = new_item()
-        TRIALS = 5
-        trial = st.session_state.stroop_trial
-        word, ink = st.session_state.stroop_item
-        if trial==0 and st.session_state.stroop_start is None: st.session_state.stroop_start = time.time()
-        st.caption("Tap the **INK COLOR** (ignore the word). 5 rounds.")
-        st.markdown(f"<h1 style='color:{ink.lower()};margin-top:0'>{word}</h1>", unsafe_allow_html=True)
-        cols = st.columns(len(COLORS))
-        for i,c in enumerate(COLORS):
-            if cols[i].button(c):
-                st.session_state.stroop_trial += 1
-                if c==ink: st.session_state.stroop_score += 1
-                if st.session_state.stroop_trial >= TRIALS:
-                    dur = time.time()-st.session_state.stroop_start
-                    score = st.session_state.stroop_score
-                    if score >= 4:
-                        text = f"{pick_new('game_good', GAME_GOOD)} {score}/{TRIALS} in {dur:.1f}s\n\n{pick_new('gq', GAME_QUOTES)}"
-                        st.success(text); st.session_state.reaction_result_payload={"type":"success","text":text}
-                    elif score == 3:
-                        text = f"{pick_new('game_avg', GAME_AVG)} {score}/{TRIALS}\n\n{pick_new('gq', GAME_QUOTES)}"
-                        st.info(text); st.session_state.reaction_result_payload={"type":"info","text":text}
-                    else:
-                        text = f"{pick_new('game_low', GAME_LOW)} {score}/{TRIALS}\n\n{pick_new('gq', GAME_QUOTES)}"
-                        st.warning(text); st.session_state.reaction_result_payload={"type":"warning","text":text}
-                    st.session_state.reaction_result_until = time.time() + 20
-                    st.session_state.update({"stroop_trial":0,"stroop_score":0,"stroop_start":None,"stroop_item":None,"show_stroop":False})
-                    _set_scroll_anchor("games")
-                    st.rerun()
-                else:
-                    st.session_state.stroop_item = new_item()
-                    _set_scroll_anchor("games")
-                    st.rerun()
+        # all trials run in the browser; the component reports once, which costs a single rerun
+        st.session_state.setdefault("stroop_round", 0)
+        game_key = f"stroop_game_{st.session_state.stroop_round}"
+        res = st.session_state.get(game_key)
+        if res:
+            score, TRIALS = res["score"], res["trials"]
+            dur, avg_rt = res["duration_ms"] / 1000, sum(res["rts_ms"]) / max(1, len(res["rts_ms"]))
+            st.session_state.stroop_last = res
+            if score >= 4:
+                text = f"{pick_new('game_good', GAME_GOOD)} {score}/{TRIALS} in {dur:.1f}s · avg reaction {avg_rt:.0f} ms\n\n{pick_new('gq', GAME_QUOTES)}"
+                st.success(text); st.session_state.reaction_result_payload={"type":"success","text":text}
+            elif score == 3:
+                text = f"{pick_new('game_avg', GAME_AVG)} {score}/{TRIALS} · avg reaction {avg_rt:.0f} ms\n\n{pick_new('gq', GAME_QUOTES)}"
+                st.info(text); st.session_state.reaction_result_payload={"type":"info","text":text}
+            else:
+                text = f"{pick_new('game_low', GAME_LOW)} {score}/{TRIALS} · avg reaction {avg_rt:.0f} ms\n\n{pick_new('gq', GAME_QUOTES)}"
+                st.warning(text); st.session_state.reaction_result_payload={"type":"warning","text":text}
+            st.session_state.reaction_result_until = time.time() + 20
+            st.session_state.stroop_round += 1
+            st.session_state.show_stroop = False
+            _set_scroll_anchor("games")
+        else:
+            st.caption("Tap the **INK COLOR** (ignore the word). 5 rounds.")
+            stroop_game(colors=["RED","BLUE","GREEN","YELLOW","PURPLE","ORANGE"], trials=5, key=game_key, default=None)
 
 # --- Game 2: Brain Teaser Quiz ---
-RIDDLES = [
-    {"q":"What is that which can run but has no legs?","answers":["clock"],"hint":"It has hands and a face but cannot walk."},
-    {"q":"What runs but never walks, has a mouth but never talks?","answers":["river"],"hint":"It flows to the sea."},
-    {"q":"What has to be broken before you can use it?","answers":["egg"],"hint":"Found at breakfast."},
-    {"q":"What has hands but can’t clap?","answers":["clock","a clock"],"hint":"It tells time."},
-    {"q":"I speak without a mouth and hear without ears. What am I?","answers":["echo"],"hint":"You hear it in valleys."},
-    {"q":"The more of this there is, the less you see. What is it?","answers":["darkness","the dark"],"hint":"Turn on a light to beat it."},
-    {"q":"What gets wetter the more it dries?","answers":["towel"],"hint":"Found after a shower."},
-    {"q":"What has many keys but can’t open a lock?","answers":["piano","keyboard"],"hint":"Makes music."},
-    {"q":"What belongs to you but is used more by others?","answers":["your name","name"],"hint":"People call you by it."},
-    {"q":"What has a head and a tail but no body?","answers":["coin","a coin"],"hint":"Flip it to decide."},
-    {"q":"What goes up but never comes down?","answers":["age"],"hint":"Birthday related."},
-    {"q":"What can you catch but not throw?","answers":["cold"],"hint":"Happens in winter."},
-    {"q":"What has a neck but no head?","answers":["bottle"],"hint":"Holds water."},
-    {"q":"What can travel around the world while staying in a corner?","answers":["stamp","a stamp"],"hint":"On an envelope."},
-    {"q":"I’m tall when I’m young and short when I’m old. What am I?","answers":["candle"],"hint":"Melted by a flame."},
-    {"q":"What gets bigger the more you take away?","answers":["hole"],"hint":"Digging makes it larger."},
-    {"q":"What has one eye but cannot see?","answers":["needle"],"hint":"Useful for stitching."},
-    {"q":"What has words but never speaks?","answers":["book"],"hint":"You read it."},
-    {"q":"What building has the most stories?","answers":["library"],"hint":"Quiet place."},
-    {"q":"Forward I am heavy, backward I am not. What am I?","answers":["ton"],"hint":"It’s a weight; read me in reverse."}
-]
-def _norm(s:str)->str: return re.sub(r"[^a-z0-9 ]+","",s.strip().lower())
+RIDDLE_BANK = CONTENT.get("riddle_bank")  # content/riddles.json, indexed once per file change
 
 with st.container(border=True):
     st.markdown("**Brain Teaser Quiz (≈2–3 min):** 5 quick riddles to spark curiosity. You can use a **Hint** if stuck.")
     if not st.session_state.show_quiz:
-        if st.button("Play Riddle Quiz"):
+        if st.button("Play Riddle Quiz") or st.session_state.pop("start_quiz", False):
             st.session_state.show_quiz=True
-            st.session_state.quiz_pool=random.sample(RIDDLES,5)
+            st.session_state.quiz_pool=RIDDLE_BANK.sample(5, st.session_state.lang)  # references into the bank
             st.session_state.quiz_idx=0
             st.session_state.quiz_score=0
             st.session_state.quiz_show_hint=False
             st.session_state.quiz_feedback=""
             _set_scroll_anchor("games")
-            st.rerun()
+            _rerun()
     else:
         i = st.session_state.quiz_idx
         q = st.session_state.quiz_pool[i]
@@ -478,8 +439,8 @@ with st.container(border=True):
         c1,c2,c3 = st.columns(3)
         if c1.button("Submit", key=f"quiz_submit_{i}"):
             if ans.strip():
-                ok = any(_norm(ans)==_norm(a) for a in q["answers"])
-                if ok: st.session_state.quiz_score += 1; st.session_state.quiz_feedback="✅ Correct!"
+                hit = RIDDLE_BANK.check(q, ans)
+                if hit: st.session_state.quiz_score += 1; st.session_state.quiz_feedback="✅ Correct!" if hit=="exact" else f"✅ Correct! (**{q['answers'][0]}**)"
                 else:  st.session_state.quiz_feedback=f"❌ Not quite. Answer: **{q['answers'][0]}**"
                 if i==4:
                     score = st.session_state.quiz_score
@@ -492,18 +453,18 @@ with st.container(border=True):
                     st.session_state.reaction_result_until=time.time()+20
                     st.session_state.show_quiz=False
                     _set_scroll_anchor("games")
-                    st.rerun()
+                    _rerun()
                 else:
                     st.session_state.quiz_idx += 1
                     st.session_state.quiz_show_hint=False
                     _set_scroll_anchor("games")
-                    st.rerun()
+                    _rerun()
             else:
                 st.info("Type your best guess or tap **Hint**.")
         if c2.button("Hint", key=f"quiz_hint_{i}"):
             st.session_state.quiz_show_hint=True
             _set_scroll_anchor("games")
-            st.rerun()
+            _rerun()
         if c3.button("Skip", key=f"quiz_skip_{i}"):
             st.info(f"Skipped. Answer: **{q['answers'][0]}**")
             if i==4:
@@ -517,12 +478,12 @@ with st.container(border=True):
                 st.session_state.reaction_result_until=time.time()+20
                 st.session_state.show_quiz=False
                 _set_scroll_anchor("games")
-                st.rerun()
+                _rerun()
             else:
                 st.session_state.quiz_idx += 1
                 st.session_state.quiz_show_hint=False
                 _set_scroll_anchor("games")
-                st.rerun()
+                _rerun()
         if st.session_state.get("quiz_feedback"): st.caption(st.session_state.quiz_feedback)
 
 # --- Gratitude Blitz (non-blocking; inputs visible) ---
@@ -533,26 +494,38 @@ st.session_state.setdefault("grat_start_ts", None)
 c1,c2 = st.columns(2)
 if c1.button("Start 60-sec timer"):
     st.session_state.grat_start_ts = time.time()
+    st.session_state.grat_done = False
+    st.session_state.grat_runs_at_start = st.session_state._script_runs + 1  # the rerun below
     _set_scroll_anchor("gratitude")
-    st.rerun()
+    _rerun()
 if c2.button("Reset"):
     st.session_state.grat_start_ts = None
+    st.session_state.grat_done = False
     _set_scroll_anchor("gratitude")
-    st.rerun()
+    _rerun()
 
-remain_ph = st.empty()
 def _remaining():
     if st.session_state.grat_start_ts is None: return None
     return int(max(0, 60 - (time.time() - st.session_state.grat_start_ts)))
 
-remain = _remaining()
-if remain is not None and remain > 0:
-    remain_ph.info(f"Time left: {remain}s")
-elif remain == 0:
-    remain_ph.success("Time’s up! Save your 3 notes below. 🌟")
-    st.session_state.grat_start_ts = None
-else:
-    remain_ph.info("Ready when you are — press Start to begin a 60-sec blitz.")
+# Only this fragment ticks (once a second, while the timer runs); the rest of the page is not re-executed.
+@st.fragment(run_every=1 if _remaining() else None)
+def gratitude_timer():
+    remain = _remaining()
+    full_reruns = st.session_state._script_runs - st.session_state.get("grat_runs_at_start", st.session_state._script_runs)
+    if remain is not None and remain > 0:
+        st.info(f"Time left: {remain}s")
+        st.caption(f"Full-page reruns during countdown: {full_reruns}")
+    elif remain == 0:
+        st.session_state.grat_start_ts = None
+        st.session_state.grat_done = True
+        st.rerun()  # one full rerun to stop the ticker
+    elif st.session_state.get("grat_done"):
+        st.success("Time’s up! Save your 3 notes below. 🌟")
+        st.caption(f"Full-page reruns during countdown: {max(0, full_reruns - 1)}")  # minus the stop rerun
+    else:
+        st.info("Ready when you are — press Start to begin a 60-sec blitz.")
+gratitude_timer()
 
 with st.form("gratitude", clear_on_submit=True):
     g1 = st.text_input("1) A tiny win")
@@ -562,10 +535,16 @@ with st.form("gratitude", clear_on_submit=True):
         st.success(pick_new("grat_msg", ["Nice! Noted for today 🌟","Beautiful — gratitude shifts the spotlight to the good."])
                    + "\n\n" + pick_new("grat_quote", ["“Where attention goes, emotion flows.”","“What we appreciate, appreciates.”"]))
 
-# Keep the gratitude section in view while the countdown ticks
-if _remaining() not in (None, 0):
-    _set_scroll_anchor("gratitude")
-    time.sleep(1)
-    st.rerun()
-
-
+# ---------- admin: live latencies (MANNMITRA_ADMIN=1) ----------
+if ADMIN_PANEL:
+    with st.sidebar.expander("⚙️ Latency (this process)"):
+        snap = METRICS.snapshot()
+        st.table([{"stage": k, "n": v["count"], "p50 ms": round(v["p50_s"] * 1e3, 1), "p95 ms": round(v["p95_s"] * 1e3, 1)}
+                  for k, v in snap.items()])
+        gs = LLM.status()
+        st.caption(f"Gemini calls {gs['calls']} · failures {gs['failures']} · timeouts {gs['timeouts']} · skipped {gs['rejected']}")
+        rs = ENGINE.risk_scheduler.stats()
+        st.caption(f"Risk checks queued {rs['queue_depth']} · last batch {rs['last_batch_size']} · mean batch {rs['mean_batch_size']:.1f}"
+                   f" · shared {rs['coalesced']} · over quota {rs['rate_limited']} · abandoned {rs['abandoned']}")
+        st.caption(f"Prometheus text: {DATA_DIR / 'metrics.prom'}" + (f" · http://127.0.0.1:{METRICS_PORT}/metrics" if METRICS_PORT else ""))
+_end_run()
@@ -0,0 +1,65 @@
+"""Per-message cost of the cue matcher as cue lists grow.
+
+    python bench/bench_matcher.py [--sizes 10,100,1000,5000] [--repeat 2000]
+
+Compares CueMatcher.scan (one pass) against the old approach of a substring
+`any()` per list plus one `re.search` per rule pattern.
+"""
+import argparse, random, re, string, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from matcher import CueMatcher
+
+MESSAGES = [
+    "I feel so stressed about exams and I can't focus on anything",
+    "aaj bahut tension hai, soch soch ke thak gaya",
+    "मुझे आज बहुत घबराहट हो रही है",
+    "just bored, nothing much happening today honestly",
+    "I have been overthinking everything since the results came out and my racing thoughts won't stop at night",
+]
+
+def _phrase(rng):
+    return " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8))) for _ in range(rng.randint(1, 3)))
+
+def synthetic_cues(n: int, seed: int = 7) -> dict[str, list[str]]:
+    rng = random.Random(seed)
+    cats = ["urgent", "high", "low", "suggest:breathing_478", "suggest:grounding_54321", "suggest:stroop"]
+    cues = {c: [] for c in cats}
+    for i in range(n):
+        cues[cats[i % len(cats)]].append(_phrase(rng) if i % 2 else r"\b" + _phrase(rng))
+    cues["suggest:breathing_478"] += [r"\bstressed\b", "tension", "घबराहट"]
+    return cues
+
+def naive(cues):
+    lists = {c: [x for x in v if not x.startswith(r"\b")] for c, v in cues.items()}
+    pats = {c: [x for x in v if x.startswith(r"\b")] for c, v in cues.items()}
+    def run(text):
+        hits = set()
+        tl = text.lower()
+        for c, v in lists.items():
+            if any(x in tl for x in v): hits.add(c)
+        for c, v in pats.items():
+            if any(re.search(p, text.lower()) for p in v): hits.add(c)
+        return hits
+    return run
+
+def per_msg_us(fn, repeat):
+    t0 = time.perf_counter()
+    for i in range(repeat):
+        fn(MESSAGES[i % len(MESSAGES)])
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10,100,1000,5000")
+    ap.add_argument("--repeat", type=int, default=2000)
+    a = ap.parse_args()
+    print(f"{'cues':>6} {'build ms':>9} {'matcher us/msg':>15} {'naive us/msg':>13}")
+    for n in map(int, a.sizes.split(",")):
+        cues = synthetic_cues(n)
+        t0 = time.perf_counter(); m = CueMatcher(cues, cache_size=0); build = (time.perf_counter() - t0) * 1e3
+        print(f"{n:>6} {build:>9.1f} {per_msg_us(m.scan, a.repeat):>15.1f} {per_msg_us(naive(cues), a.repeat):>13.1f}")
+
+if __name__ == "__main__":
+    main()
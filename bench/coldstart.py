@@ -0,0 +1,111 @@
+"""Cold-start benchmark: fresh interpreter -> first painted page, lazy vs. eager init.
+
+    python bench/coldstart.py                 # 5 fresh processes per scenario + import breakdown
+    python bench/coldstart.py --runs 10 --top 20
+
+Each run is a new `python` process that imports Streamlit's AppTest harness and
+executes app.py once headless (the first paint), then once more (a rerun).
+Scenarios cross MANNMITRA_LAZY_INIT=1/0 with no Gemini key / a dummy key (no
+request is ever sent). Reported per scenario (medians):
+
+    process     spawn -> exit, includes interpreter start and the harness import
+    first_paint first AppTest run of app.py
+    rerun       second run in the same process
+    llm_init    building a Gemini client afterwards: what the first chat turn
+                still pays in lazy mode (near 0 once genai is imported)
+
+One extra run per mode under `python -X importtime` gives the import-time
+breakdown: self time summed per top-level package, largest first. That run
+skips the llm_init step, so the breakdown only counts imports up to the
+rerun, not the Gemini client built after it.
+"""
+import argparse, json, os, statistics, subprocess, sys, tempfile, time
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SCENARIOS = [("lazy", False), ("lazy", True), ("eager", False), ("eager", True)]
+WATCH = ("pandas", "numpy", "google.genai", "pyarrow", "http.server")
+
+def child(warm: bool = True):
+    """Runs inside the fresh process; prints one JSON line."""
+    t0 = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    harness = time.perf_counter() - t0
+    key = os.environ.get("GEMINI_API_KEY", "")
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=60)
+    at.secrets["GEMINI_API_KEY"] = key
+    t0 = time.perf_counter(); at.run(); first_paint = time.perf_counter() - t0
+    if at.exception: raise SystemExit(f"app raised: {at.exception[0].value}")
+    t0 = time.perf_counter(); at.run(); rerun = time.perf_counter() - t0
+    loaded = [m for m in WATCH if m in sys.modules]
+    llm_init = None
+    if warm:
+        from gemini import GeminiGateway
+        t0 = time.perf_counter(); GeminiGateway("dummy").warm(); llm_init = time.perf_counter() - t0
+    print(json.dumps({"harness": harness, "first_paint": first_paint, "rerun": rerun, "llm_init": llm_init, "loaded": loaded}))
+
+def spawn(mode: str, key: bool, importtime: bool = False) -> tuple[dict, str]:
+    cmd = [sys.executable, *(["-X", "importtime"] if importtime else []), __file__, "--child",
+           *(["--no-warm"] if importtime else [])]
+    with tempfile.TemporaryDirectory() as data_dir:  # a fresh data dir per run; the repo's data/ is never touched
+        env = {**os.environ, "MANNMITRA_LAZY_INIT": "1" if mode == "lazy" else "0", "GEMINI_API_KEY": "dummy" if key else "",
+               "MANNMITRA_LOG_LEVEL": "WARNING", "PYTHONPATH": str(ROOT),  # as `streamlit run app.py` would
+               "MANNMITRA_DATA_DIR": data_dir}
+        t0 = time.perf_counter()
+        p = subprocess.run(cmd, env=env, cwd=ROOT, capture_output=True, text=True)
+        wall = time.perf_counter() - t0
+    if p.returncode:
+        raise RuntimeError(f"{mode}/{'key' if key else 'nokey'} child failed:\n{p.stderr[-2000:]}")
+    res = json.loads(p.stdout.strip().splitlines()[-1])
+    res["process"] = wall
+    return res, p.stderr
+
+def import_breakdown(stderr: str) -> list[tuple[str, float]]:
+    """`-X importtime` output -> [(top-level package, self seconds)], largest first."""
+    per = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line: continue
+        _, self_us, _, name = [x.strip() for x in line.replace("import time:", "|", 1).split("|")]
+        per[name.split(".")[0]] += int(self_us) / 1e6
+    return sorted(per.items(), key=lambda kv: -kv[1])
+
+def run(runs: int) -> dict:
+    """{scenario: {metric: median seconds, "loaded": [...]}} over `runs` fresh processes each."""
+    out = {}
+    for mode, key in SCENARIOS:
+        samples = [spawn(mode, key)[0] for _ in range(runs)]
+        name = f"{mode},{'key' if key else 'nokey'}"
+        out[name] = {m: statistics.median(s[m] for s in samples) for m in ("process", "harness", "first_paint", "rerun", "llm_init")}
+        out[name]["loaded"] = samples[-1]["loaded"]
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="MannMitra cold-start benchmark")
+    ap.add_argument("--runs", type=int, default=5, help="fresh processes per scenario")
+    ap.add_argument("--top", type=int, default=12, help="packages shown in the import breakdown")
+    ap.add_argument("--out", help="also write the numbers here as JSON")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--no-warm", action="store_true", help=argparse.SUPPRESS)
+    a = ap.parse_args()
+    if a.child:
+        child(warm=not a.no_warm); return
+    spawn("lazy", False)  # warm the OS file cache so the first scenario isn't penalised
+    results = run(a.runs)
+    print(f"{'scenario':<12}{'process':>10}{'harness':>10}{'1st paint':>11}{'rerun':>9}{'llm init':>10}  loaded after paint")
+    for name, r in results.items():
+        print(f"{name:<12}{r['process']*1e3:>8.0f}ms{r['harness']*1e3:>8.0f}ms{r['first_paint']*1e3:>9.0f}ms"
+              f"{r['rerun']*1e3:>7.0f}ms{r['llm_init']*1e3:>8.0f}ms  {', '.join(r['loaded']) or '-'}")
+    breakdown = {}
+    for mode in ("lazy", "eager"):
+        _, err = spawn(mode, True, importtime=True)
+        breakdown[mode] = import_breakdown(err)
+        total = sum(s for _, s in breakdown[mode])
+        print(f"\nimport time, {mode} with key: {total*1e3:.0f} ms total (self time per top-level package)")
+        for pkg, s in breakdown[mode][:a.top]:
+            print(f"  {pkg:<24}{s*1e3:>8.1f} ms")
+    if a.out:
+        Path(a.out).write_text(json.dumps({"results": results, "imports": breakdown}, indent=1))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""Micro-benchmarks for the app's hot paths, with regression checks.
+
+    python bench/suite.py                          # full run -> bench/results.json
+    python bench/suite.py --quick                  # small mood sizes, fewer repeats
+    python bench/suite.py --save-baseline          # also store the run as bench/baseline.json
+    python bench/suite.py --only risk,mood --sizes 10,1000
+
+Covers keyword risk classification, suggestion choice and retrieval, riddle-answer
+normalisation and checking against banks of 20 to 10,000 riddles, content loading, the WHO-5 save, the mood-chart aggregation
+(SQLite rollup vs. the old pandas-over-CSV path) on synthetic mood_log.csv
+files of 10 to 1,000,000 rows, per-user chart/save cost as the user count grows, full headless script runs through
+Streamlit's AppTest, and cold start (fresh process to first paint, lazy vs. eager init). Times are per call. A case whose median is more than
+`--threshold` slower than in the baseline is flagged and the exit code is 1.
+"""
+import argparse, csv, json, os, platform, random, statistics, sys, tempfile, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import engine                          # noqa: E402
+from content import load_json_safe     # noqa: E402
+from engine import Engine             # noqa: E402
+from llm_cache import LLMCache         # noqa: E402
+from mood_store import MoodStore       # noqa: E402
+from retrieval import SuggestionIndex  # noqa: E402
+from riddles import RiddleBank, norm_answer  # noqa: E402
+from risk import classify_risk, choose_suggestion  # noqa: E402
+
+MESSAGES = [
+    "I feel so stressed about exams and I can't focus on anything",
+    "aaj bahut tension hai, soch soch ke thak gaya",
+    "मुझे आज बहुत घबराहट हो रही है",
+    "just bored, nothing much happening today honestly",
+    "I have been overthinking everything since the results came out and my racing thoughts won't stop at night",
+    "feeling very sad and lonely these days",
+    "I want to end my life",
+]
+ANSWERS = ["Clock", "  a CLOCK!! ", "the dark", "Your name.", "piano?", "  Ton  "]
+
+def timeit(fn, repeat: int, warmup: int = 1) -> dict:
+    for _ in range(warmup): fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter_ns(); fn(); times.append(time.perf_counter_ns() - t0)
+    times.sort()
+    return {"median_us": statistics.median(times) / 1e3, "p95_us": times[int(0.95 * (len(times) - 1))] / 1e3,
+            "min_us": times[0] / 1e3, "n": repeat}
+
+def cycle(items):
+    it = iter(())
+    def nxt():
+        nonlocal it
+        try: return next(it)
+        except StopIteration:
+            it = iter(items); return next(it)
+    return nxt
+
+# ---------- cases ----------
+def bench_risk(a, out):
+    content = engine.build_content(ROOT)
+    matcher, index = content.get("matcher"), content.get("suggest_index")
+    msg = cycle(MESSAGES)
+    # the matcher memoises scans; "_cold" clears that cache first, i.e. the cost of a new message
+    def cold(fn, *extra):
+        def run():
+            matcher.scan.cache_clear()
+            fn(msg(), matcher, *extra)
+        return run
+    out["risk.classify_keyword"] = timeit(lambda: classify_risk(msg(), matcher), a.repeat)
+    out["risk.classify_keyword_cold"] = timeit(cold(classify_risk), a.repeat)
+    out["risk.choose_suggestion"] = timeit(lambda: choose_suggestion(msg(), matcher, index), a.repeat)
+    out["risk.choose_suggestion_cold"] = timeit(cold(choose_suggestion, index), a.repeat)
+
+def bench_retrieval(a, out):
+    msg = cycle(MESSAGES)
+    index = engine.build_content(ROOT).get("suggest_index")
+    out[f"retrieval.search[{len(index)}]"] = timeit(lambda: index.search(msg(), k=3), a.repeat)
+    rng = random.Random(5)
+    words = [w for m in MESSAGES for w in m.split()] + [*"abcdefghij"]
+    for n in (100, 500, 1000):
+        texts = [" ".join(rng.choices(words, k=40)) + f" item{i}" for i in range(n)]
+        items = [{"id": f"item{i}", "type": "exercise", "title": f"Item {i}"} for i in range(n)]
+        t0 = time.perf_counter()
+        big = SuggestionIndex(items, texts)
+        out[f"retrieval.build[{n}]"] = {"median_us": (time.perf_counter() - t0) * 1e6, "n": 1}
+        out[f"retrieval.search[{n}]"] = timeit(lambda: big.search(msg(), k=3), a.repeat // 4)
+
+def _typo(word: str, n: int, rnd: random.Random) -> str:
+    for _ in range(n):
+        i = rnd.randrange(len(word))
+        word = word[:i] + rnd.choice("abcdefghijklmnopqrstuvwxyz".replace(word[i], "")) + word[i + 1:]
+    return word
+
+def bench_riddle(a, out):
+    ans = cycle(ANSWERS)
+    out["riddle.norm_answer"] = timeit(lambda: norm_answer(ans()), a.repeat * 5)
+    rnd = random.Random(5)
+    def word(): return "".join(rnd.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rnd.randint(4, 10)))
+    for n in [20, *(int(x) for x in a.riddle_sizes.split(","))]:
+        rows = (load_json_safe(ROOT / "content/riddles.json", {})["riddles"][:20] if n == 20 else
+                [{"q": f"riddle {i}", "answers": [word(), word()], "hint": ""} for i in range(n)])
+        if n <= 1000:  # a single sub-millisecond build is mostly noise
+            out[f"riddle.build[{n}]"] = timeit(lambda: RiddleBank(rows), 20)
+        else:
+            t0 = time.perf_counter()
+            RiddleBank(rows)
+            out[f"riddle.build[{n}]"] = {"median_us": (time.perf_counter() - t0) * 1e6, "n": 1}
+        bank = RiddleBank(rows)
+        probes = []
+        for r in (bank.riddles[rnd.randrange(len(bank))] for _ in range(200)):
+            k = r["keys"][0]
+            probes.append((r, rnd.choice([k.upper() + " ", _typo(k, 1, rnd), _typo(k, 2, rnd) if len(k) >= 6 else k, word()])))
+        probe = cycle(probes)
+        out[f"riddle.check[{n}]"] = timeit(lambda: bank.check(*probe()), a.repeat)
+        out[f"riddle.sample5[{n}]"] = timeit(lambda: bank.sample(5), a.repeat)
+
+def bench_content(a, out):
+    for name in ("who5", "exercises", "helplines_in", "cues"):
+        path = ROOT / f"content/{name}.json"
+        out[f"content.load_json_safe[{name}]"] = timeit(lambda: load_json_safe(path, {}), a.repeat // 4)
+    out["content.load_json_safe[missing]"] = timeit(lambda: load_json_safe(ROOT / "content/nope.json", {}), a.repeat // 4)
+    reg = engine.build_content(ROOT)
+    out["content.registry_get"] = timeit(lambda: reg.get("helplines"), a.repeat)
+
+def write_mood_csv(path: Path, rows: int, seed: int = 11):
+    """`rows` check-ins spread over the year before now, in the CSV-era format (ts,score,note)."""
+    rng, now = random.Random(seed), int(time.time())
+    span = 365 * 86400
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["ts", "score", "note"])
+        for ts in sorted(now - rng.randrange(span) for _ in range(rows)):
+            w.writerow([ts, rng.randrange(0, 26) * 4, "ok" if rng.random() < 0.3 else ""])
+
+def csv_chart(path: Path):
+    """The pre-SQLite chart: read the whole CSV and group by day on every rerun."""
+    import pandas as pd
+    df = pd.read_csv(path)
+    df["date"] = pd.to_datetime(df["ts"], unit="s").dt.date
+    return df.groupby("date")["score"].mean().tail(14)
+
+def csv_save(path: Path, total: int):
+    """The pre-SQLite WHO-5 save: read the whole CSV, append one row, write it all back."""
+    import pandas as pd
+    row = pd.DataFrame([{"ts": int(time.time()), "score": total, "note": ""}])
+    row = pd.concat([pd.read_csv(path), row], ignore_index=True)
+    row.to_csv(path, index=False)
+
+def bench_mood(a, out):
+    answers = [3, 4, 2, 5, 1]
+    for n in a.sizes:
+        slow = n >= 100_000
+        reps = 3 if slow else max(5, a.repeat // 20)
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            write_mood_csv(tmp / "mood_log.csv", n)
+            out[f"mood.csv_chart[{n}]"] = timeit(lambda: csv_chart(tmp / "mood_log.csv"), reps, warmup=0 if slow else 1)
+            if n <= a.csv_save_max:
+                legacy = tmp / "legacy.csv"
+                legacy.write_bytes((tmp / "mood_log.csv").read_bytes())
+                out[f"mood.csv_save[{n}]"] = timeit(lambda: csv_save(legacy, 60), reps, warmup=0)
+            t0 = time.perf_counter()
+            MoodStore(tmp / "mood.sqlite", legacy_csv=tmp / "mood_log.csv")
+            out[f"mood.import_csv[{n}]"] = {"median_us": (time.perf_counter() - t0) * 1e6, "n": 1}
+            eng = Engine(ROOT, data_dir=tmp, cache=LLMCache())
+            out[f"who5.save_checkin[{n}]"] = timeit(lambda: eng.save_checkin(answers), max(5, a.repeat // 20))
+            out[f"mood.daily14[{n}]"] = timeit(lambda: eng.mood.daily(14), max(5, a.repeat // 10))
+
+def bench_mood_users(a, out):
+    """One shared log of `--user-rows` rows split over 10..100k users: one user's chart,
+    save and 30-day range query should cost the same whatever the user count."""
+    now, reps = int(time.time()), max(5, a.repeat // 10)
+    for users in (10, 1000, 100_000):
+        rng = random.Random(users)
+        with tempfile.TemporaryDirectory() as tmp:
+            store = MoodStore(Path(tmp) / "mood.sqlite")
+            for lo in range(0, a.user_rows, 100_000):
+                store.add_many([(f"u{rng.randrange(users)}", now - rng.randrange(365 * 86400), rng.randrange(0, 26) * 4, "")
+                                for _ in range(min(100_000, a.user_rows - lo))])
+            out[f"mood.user_daily14[{users}u]"] = timeit(lambda: store.daily(14, user_id="u0"), reps)
+            out[f"mood.user_rows30d[{users}u]"] = timeit(lambda: store.rows("u0", since_ts=now - 30 * 86400), reps)
+            out[f"mood.user_add[{users}u]"] = timeit(lambda: store.add(60, user_id="u0"), max(5, a.repeat // 20))
+
+def bench_apptest(a, out):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["MANNMITRA_DATA_DIR"] = tmp  # never touch the repo's data/ (mood log, metrics, spill files)
+        try:
+            _bench_apptest(a, out)
+        finally:
+            os.environ.pop("MANNMITRA_DATA_DIR", None)
+
+def _bench_apptest(a, out):
+    from streamlit.testing.v1 import AppTest
+    os.environ.pop("GEMINI_API_KEY", None)  # keep the run offline
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=60)
+    at.secrets["GEMINI_API_KEY"] = ""
+    t0 = time.perf_counter(); at.run()
+    out["apptest.first_run"] = {"median_us": (time.perf_counter() - t0) * 1e6, "n": 1}
+    if at.exception: raise RuntimeError(f"app raised: {at.exception[0].value}")
+    out["apptest.rerun"] = timeit(at.run, a.apptest_runs, warmup=0)
+    def chat_turn():
+        at.chat_input[0].set_value(f"feeling stressed about exams {time.perf_counter_ns()}").run()
+    out["apptest.chat_turn"] = timeit(chat_turn, a.apptest_runs, warmup=0)
+
+def bench_coldstart(a, out):
+    from bench.coldstart import run  # fresh processes; see bench/coldstart.py for the import breakdown
+    for name, r in run(a.apptest_runs).items():
+        for m in ("process", "first_paint"):
+            out[f"coldstart.{m}[{name}]"] = {"median_us": r[m] * 1e6, "n": a.apptest_runs}
+
+CASES = {"risk": bench_risk, "retrieval": bench_retrieval, "riddle": bench_riddle, "content": bench_content, "mood": bench_mood,
+         "mood_users": bench_mood_users, "apptest": bench_apptest, "coldstart": bench_coldstart}
+
+# ---------- reporting ----------
+def compare(results: dict, baseline: dict, threshold: float, min_us: float) -> list[str]:
+    flagged = []
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if not base: continue
+        ratio = cur["median_us"] / max(base["median_us"], 1e-9)
+        if ratio > 1 + threshold and cur["median_us"] - base["median_us"] > min_us:
+            flagged.append(f"{name}: {base['median_us']:.1f}us -> {cur['median_us']:.1f}us ({ratio:.2f}x)")
+    return flagged
+
+def main():
+    ap = argparse.ArgumentParser(description="MannMitra micro-benchmarks")
+    ap.add_argument("--only", help=f"comma-separated subset of {','.join(CASES)}")
+    ap.add_argument("--sizes", default="10,1000,100000,1000000", help="mood_log.csv row counts")
+    ap.add_argument("--repeat", type=int, default=2000)
+    ap.add_argument("--user-rows", type=int, default=300_000, help="log size for the per-user cases")
+    ap.add_argument("--riddle-sizes", default="1000,10000", help="synthetic riddle bank sizes")
+    ap.add_argument("--apptest-runs", type=int, default=5)
+    ap.add_argument("--csv-save-max", type=int, default=100_000, help="skip the old CSV save above this size")
+    ap.add_argument("--quick", action="store_true", help="sizes 10,1000 and 1/4 of the repeats")
+    ap.add_argument("--out", default=str(ROOT / "bench/results.json"))
+    ap.add_argument("--baseline", default=str(ROOT / "bench/baseline.json"))
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs. baseline (0.25 = 25%%)")
+    ap.add_argument("--min-us", type=float, default=2.0, help="ignore slowdowns smaller than this")
+    a = ap.parse_args()
+    if a.quick: a.sizes, a.repeat, a.user_rows, a.riddle_sizes = "10,1000", a.repeat // 4, 20_000, "1000"
+    a.sizes = [int(x) for x in a.sizes.split(",")]
+
+    results = {}
+    for name in (a.only.split(",") if a.only else CASES):
+        t0 = time.perf_counter()
+        CASES[name](a, results)
+        print(f"[{name}] {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+    w = max(map(len, results))
+    for name, r in results.items():
+        extra = f"  p95 {r['p95_us']:>11.1f}" if "p95_us" in r else ""
+        print(f"{name:<{w}}  median {r['median_us']:>11.1f} us{extra}")
+
+    run = {"meta": {"python": platform.python_version(), "machine": platform.machine(), "platform": platform.platform(),
+                    "when": time.strftime("%Y-%m-%dT%H:%M:%S"), "quick": a.quick}, "results": results}
+    Path(a.out).write_text(json.dumps(run, indent=1))
+    print(f"\nwrote {a.out}")
+
+    flagged = []
+    if Path(a.baseline).exists() and not a.save_baseline:
+        flagged = compare(results, json.loads(Path(a.baseline).read_text())["results"], a.threshold, a.min_us)
+        print(f"vs. {a.baseline}: " + ("no regressions" if not flagged else f"{len(flagged)} regression(s)"))
+        for f in flagged: print("  REGRESSION " + f)
+    if a.save_baseline:
+        Path(a.baseline).write_text(json.dumps(run, indent=1))
+        print(f"saved baseline {a.baseline}")
+    sys.exit(1 if flagged else 0)
+
+if __name__ == "__main__":
+    main()
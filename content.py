@@ -0,0 +1,81 @@
+"""Process-wide content registry for the JSON files under content/.
+
+Each file is parsed and validated once and shared by every session. `get`
+only stats the file; it re-reads it when the mtime changes, so helplines or
+cue lists can be edited without a restart. Values derived from content (the
+merged exercise list, the cue matcher) are rebuilt only when a source changes.
+"""
+import json, os, threading, time
+from pathlib import Path
+
+def load_json_safe(path: Path, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return default
+
+class ContentRegistry:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._files: dict[str, dict] = {}    # name -> path, default, validate, value, mtime, version, timings
+        self._derived: dict[str, dict] = {}  # name -> deps, fn, value, versions
+        self._lock = threading.RLock()
+
+    def register(self, name: str, rel_path: str, default, validate=None):
+        """`validate(value)` raises (e.g. ValueError/KeyError) to reject a file; the last good value stays."""
+        self._files[name] = {"path": self.root / rel_path, "default": default, "validate": validate,
+                             "value": default, "mtime": None, "version": 0,
+                             "loads": 0, "load_ms": 0.0, "error": None}
+        return self
+
+    def derive(self, name: str, deps: list[str], fn):
+        """Register `fn(*dep_values)`, recomputed only when one of `deps` reloads."""
+        self._derived[name] = {"deps": deps, "fn": fn, "value": None, "versions": None, "build_ms": 0.0}
+        return self
+
+    def _refresh(self, name: str) -> dict:
+        e = self._files[name]
+        try:
+            mtime = os.stat(e["path"]).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == e["mtime"] and e["loads"]:
+            return e
+        with self._lock:
+            if mtime == e["mtime"] and e["loads"]:
+                return e
+            t0 = time.perf_counter()
+            value = load_json_safe(e["path"], e["default"]) if mtime is not None else e["default"]
+            try:
+                if e["validate"]: e["validate"](value)
+                e["value"], e["error"] = value, None
+            except Exception as err:
+                e["error"] = f"{type(err).__name__}: {err}"  # keep serving the last good value
+            e["mtime"], e["version"] = mtime, e["version"] + 1
+            e["loads"] += 1
+            e["load_ms"] = (time.perf_counter() - t0) * 1e3
+        return e
+
+    def get(self, name: str):
+        if name in self._derived:
+            d = self._derived[name]
+            deps = [self._refresh(dep) for dep in d["deps"]]
+            versions = tuple(dep["version"] for dep in deps)
+            if versions != d["versions"]:
+                with self._lock:
+                    if versions != d["versions"]:
+                        t0 = time.perf_counter()
+                        d["value"] = d["fn"](*(dep["value"] for dep in deps))
+                        d["versions"], d["build_ms"] = versions, (time.perf_counter() - t0) * 1e3
+            return d["value"]
+        return self._refresh(name)["value"]
+
+    def stats(self) -> dict:
+        """Per-entry load/build timings plus how long a full freshness check takes now."""
+        t0 = time.perf_counter()
+        for name in self._files: self._refresh(name)
+        check_us = (time.perf_counter() - t0) * 1e6
+        out = {n: {"loads": e["loads"], "load_ms": e["load_ms"], "error": e["error"]} for n, e in self._files.items()}
+        out.update({n: {"build_ms": d["build_ms"]} for n, d in self._derived.items()})
+        return {"entries": out, "check_us": check_us}
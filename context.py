@@ -0,0 +1,87 @@
+"""Rolling conversation context for the reply prompt.
+
+Each session keeps a running summary plus the turns not yet folded into it.
+The prompt gets the summary and as many of the newest turns as fit the token
+budget, so its size stays flat however long the session runs. Every
+`summarize_every` turns past `keep_turns`, the oldest batch is folded into the
+summary (by the engine, off the session thread) instead of re-summarising
+the whole chat.
+"""
+import logging, threading
+
+log = logging.getLogger("mannmitra.context")
+
+def estimate_tokens(text: str) -> int:
+    """Rough count without a tokenizer: ~4 chars/token for Latin script, ~2 for Devanagari."""
+    latin = len(text.encode("ascii", "ignore"))
+    return (latin + 3) // 4 + (len(text) - latin + 1) // 2
+
+def trim_tokens(text: str, max_tokens: int) -> str:
+    """Keep the end of `text` (the newest part of a summary) within `max_tokens`."""
+    n = estimate_tokens(text)
+    if n <= max_tokens: return text
+    return "…" + text[-max(0, len(text) * max_tokens // n - 1):]
+
+def _line(role: str, text: str) -> str:
+    return f"{'User' if role == 'user' else 'MannMitra'}: {text}"
+
+def fallback_summary(summary: str, batch: list[tuple[str, str]], max_tokens: int) -> str:
+    """Offline fold: append the gist of the user's side of `batch`."""
+    gist = "; ".join(t[:80] for r, t in batch if r == "user")
+    return trim_tokens(f"{summary} {gist}".strip(), max_tokens)
+
+def summary_prompt(summary: str, batch: list[tuple[str, str]], max_tokens: int) -> str:
+    return ("Update the running summary of this wellness chat with the new turns. Third person, plain text, "
+            f"under {max_tokens * 3 // 4} words; keep feelings, events and what helped.\n"
+            f"Summary so far: {summary or '(none)'}\nNew turns:\n" + "\n".join(_line(r, t) for r, t in batch))
+
+class ConversationContext:
+    def __init__(self, budget_tokens: int = 800, keep_turns: int = 6, summarize_every: int = 6,
+                 summary_share: float = 0.35):
+        self.budget_tokens, self.keep_turns, self.summarize_every = budget_tokens, keep_turns, summarize_every
+        self.summary_tokens = int(budget_tokens * summary_share)
+        self.summary = ""
+        self.turns: list[tuple[str, str]] = []  # not yet in the summary, oldest first
+        self.folds = 0
+        self.last_prompt_tokens = 0
+        self._folding = False
+        self._lock = threading.Lock()
+
+    def add(self, role: str, text: str):
+        with self._lock:
+            self.turns.append((role, text))
+
+    def due(self) -> list[tuple[str, str]] | None:
+        """The oldest batch if it should be folded now (at most one fold in flight)."""
+        with self._lock:
+            if self._folding or len(self.turns) < self.keep_turns + self.summarize_every:
+                return None
+            self._folding = True
+            return self.turns[:self.summarize_every]
+
+    def fold(self, batch: list[tuple[str, str]], summary: str):
+        with self._lock:
+            del self.turns[:len(batch)]  # only folds remove turns, so the batch is still at the front
+            self.summary, self._folding = trim_tokens(summary, self.summary_tokens), False
+            self.folds += 1
+
+    def render(self) -> str:
+        """Summary plus the newest turns that fit the budget."""
+        with self._lock:
+            summary, turns = self.summary, list(self.turns)
+        used, lines = estimate_tokens(summary), []
+        for role, text in reversed(turns):
+            line = _line(role, text)
+            cost = estimate_tokens(line)
+            if used + cost > self.budget_tokens: break
+            lines.append(line)
+            used += cost
+        parts = [f"Conversation so far (summary): {summary}"] if summary else []
+        if lines: parts.append("Recent turns:\n" + "\n".join(reversed(lines)))
+        return "\n".join(parts)
+
+    def record_prompt(self, prompt: str, context: str):
+        self.last_prompt_tokens = estimate_tokens(prompt)
+        log.info("reply prompt ~%d tokens (context %d, summary %d, %d unfolded turns, %d folds)",
+                 self.last_prompt_tokens, estimate_tokens(context), estimate_tokens(self.summary),
+                 len(self.turns), self.folds)
@@ -0,0 +1,387 @@
+"""Headless MannMitra core: chat turn, WHO-5 scoring and mood logging.
+
+Everything here runs without Streamlit. app.py holds one `Engine` per process
+(st.cache_resource) and only adds the UI; loadtest/ and bench/ drive the same
+object directly.
+"""
+import hashlib, os, threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import risk
+from content import ContentRegistry
+from context import ConversationContext, fallback_summary, summary_prompt
+from gemini import CircuitBreaker, CircuitOpen, GeminiGateway
+from llm_cache import LLMCache
+from metrics import METRICS
+from mood_store import LEGACY_USER, MoodStore
+from pipeline import TurnResult, run_streaming_turn, run_turn
+from retrieval import SuggestionIndex, item_text
+from riddles import RiddleBank
+from risk_scheduler import RiskScheduler, TokenBucket
+
+APP_DIR = Path(__file__).parent
+RECAP_MEMO = 256  # finished/in-flight recap jobs kept per process
+
+SYSTEM = ("You are MannMitra, an empathetic, non-judgmental wellness companion for Indian youth. "
+          "Be supportive, reduce stigma. Offer gentle self-care (breathing, grounding, journaling). "
+          "Do not diagnose or prescribe. If crisis/self-harm hints appear, encourage immediate help and show helplines.")
+
+# ---------- extra exercises ----------
+MORE_EXERCISES = {
+    "box_breath":{"title":"Box Breathing","when":"Feeling anxious or heart racing; need a quick reset.",
+                  "what":"Inhale–Hold–Exhale–Hold for equal counts.","steps":["Inhale 4s","Hold 4s","Exhale 4s","Hold 4s"],"cycles":4},
+    "body_scan":{"title":"60-sec Body Scan","when":"Tense or restless; want to relax before sleep or study.",
+                 "what":"Move attention head to toe, relaxing each area.",
+                 "steps":["Head & face relax","Neck & shoulders soften","Chest & arms loosen","Stomach unclench","Legs feel heavy","Notice easy breathing"],"cycles":1},
+    "stop_skill":{"title":"STOP Skill","when":"Strong emotions or urge to react; need a pause.",
+                  "what":"DBT micro-skill: pause, breathe, observe, proceed.",
+                  "steps":["S—Stop","T—Take a slow breath","O—Observe body/thoughts","P—Proceed with one small helpful action"],"cycles":1}
+}
+
+# ---------- games (suggestion targets; the UI lives in app.py) ----------
+GAMES = {
+    "stroop":{"title":"Color–Word Stroop","suggest":"Play a 1-minute Focus game",
+              "when":"Bored, distracted or can't focus; reset attention in a minute.","what":"Tap the ink color, ignore the word."},
+    "riddles":{"title":"Brain Teaser Quiz","suggest":"Try 5 quick riddles",
+               "when":"Need a light break or something fun.","what":"Five short riddles with hints."},
+    "gratitude":{"title":"Gratitude Blitz","suggest":"Try a 60-sec gratitude blitz",
+                 "when":"Everything feels negative; notice small good things.","what":"Write 3 small good things in 60 seconds."},
+}
+
+# built-in riddles, used when content/riddles.json is missing or invalid
+RIDDLES = [
+    {"q":"What is that which can run but has no legs?","answers":["clock"],"hint":"It has hands and a face but cannot walk."},
+    {"q":"What runs but never walks, has a mouth but never talks?","answers":["river"],"hint":"It flows to the sea."},
+    {"q":"What has to be broken before you can use it?","answers":["egg"],"hint":"Found at breakfast."},
+    {"q":"What has hands but can’t clap?","answers":["clock","a clock"],"hint":"It tells time."},
+    {"q":"I speak without a mouth and hear without ears. What am I?","answers":["echo"],"hint":"You hear it in valleys."},
+    {"q":"The more of this there is, the less you see. What is it?","answers":["darkness","the dark"],"hint":"Turn on a light to beat it."},
+    {"q":"What gets wetter the more it dries?","answers":["towel"],"hint":"Found after a shower."},
+    {"q":"What has many keys but can’t open a lock?","answers":["piano","keyboard"],"hint":"Makes music."},
+    {"q":"What belongs to you but is used more by others?","answers":["your name","name"],"hint":"People call you by it."},
+    {"q":"What has a head and a tail but no body?","answers":["coin","a coin"],"hint":"Flip it to decide."},
+    {"q":"What goes up but never comes down?","answers":["age"],"hint":"Birthday related."},
+    {"q":"What can you catch but not throw?","answers":["cold"],"hint":"Happens in winter."},
+    {"q":"What has a neck but no head?","answers":["bottle"],"hint":"Holds water."},
+    {"q":"What can travel around the world while staying in a corner?","answers":["stamp","a stamp"],"hint":"On an envelope."},
+    {"q":"I’m tall when I’m young and short when I’m old. What am I?","answers":["candle"],"hint":"Melted by a flame."},
+    {"q":"What gets bigger the more you take away?","answers":["hole"],"hint":"Digging makes it larger."},
+    {"q":"What has one eye but cannot see?","answers":["needle"],"hint":"Useful for stitching."},
+    {"q":"What has words but never speaks?","answers":["book"],"hint":"You read it."},
+    {"q":"What building has the most stories?","answers":["library"],"hint":"Quiet place."},
+    {"q":"Forward I am heavy, backward I am not. What am I?","answers":["ton"],"hint":"It’s a weight; read me in reverse."}
+]
+
+# ---------- content files (safe defaults) ----------
+def _validate_who5(v):
+    if len(v["items"]) != 5: raise ValueError("WHO-5 needs exactly 5 items")
+
+def _validate_exercises(v):
+    for eid, ex in v.items():
+        if not ex.get("title") or not isinstance(ex.get("steps"), list): raise ValueError(f"{eid}: needs title and steps")
+
+def _validate_helplines(v):
+    for hid in ("tele_manas", "kiran"):  # the crisis banner names these two
+        if not v[hid]["name"] or not v[hid]["phone"]: raise ValueError(f"{hid}: needs name and phone")
+
+def _validate_riddles(v):
+    for i, r in enumerate(v["riddles"]):
+        if not r.get("q") or not r.get("answers") or not all(isinstance(a, str) for a in r["answers"]):
+            raise ValueError(f"riddle {i}: needs q and a list of answers")
+
+def _merge_exercises(ex):
+    merged = {
+        "breathing_478": {
+            "title": ex.get("breathing_478", {}).get("title","4-7-8 Breathing"),
+            "when": "Anxious or restless; calm down in <2 min.",
+            "what": "Paced breathing that nudges the body toward calm.",
+            "steps": ex.get("breathing_478", {}).get("steps", ["Inhale 4s","Hold 7s","Exhale 8s"]),
+            "cycles": ex.get("breathing_478", {}).get("cycles", 3)
+        },
+        "grounding_54321": {
+            "title": ex.get("grounding_54321", {}).get("title","5-4-3-2-1 Grounding"),
+            "when": "Overthinking; come back to the present.",
+            "what": "Use your senses to anchor attention safely.",
+            "steps": ex.get("grounding_54321", {}).get("steps", ["5 see","4 touch","3 hear","2 smell","1 taste"]),
+            "cycles": 1
+        }
+    }
+    merged.update(MORE_EXERCISES)
+    return merged
+
+def build_suggest_index(exercises: dict, keywords: dict) -> SuggestionIndex:
+    """Exercises (file + MORE_EXERCISES) and games, with their keyword phrasings, as one index."""
+    items, texts, anchors = [], [], []
+    for eid, ex in _merge_exercises(exercises).items():
+        items.append({"id":eid, "type":"exercise", "title":f"Try {ex['title']}"})
+        texts.append(item_text(ex, keywords.get(eid, [])))
+        anchors.append(keywords.get(eid, []))
+    for gid, g in GAMES.items():
+        items.append({"id":gid, "type":"game", "title":g["suggest"]})
+        texts.append(item_text(g, keywords.get(gid, [])))
+        anchors.append(keywords.get(gid, []))
+    return SuggestionIndex(items, texts, anchors)
+
+def build_content(app_dir: Path = APP_DIR) -> ContentRegistry:
+    return (ContentRegistry(app_dir)
+        .register("who5", "content/who5.json", {
+            "items":[
+                "I have felt cheerful and in good spirits",
+                "I have felt calm and relaxed",
+                "I have felt active and vigorous",
+                "I woke up feeling fresh and rested",
+                "My daily life has been filled with things that interest me"
+            ]
+        }, _validate_who5)
+        .register("exercises", "content/exercises.json", {
+            "breathing_478":{"title":"4-7-8 Breathing","steps":["Inhale 4s","Hold 7s","Exhale 8s"],"cycles":3},
+            "grounding_54321":{"title":"5-4-3-2-1 Grounding","steps":["5 see","4 touch","3 hear","2 smell","1 taste"],"cycles":1}
+        }, _validate_exercises)
+        .register("helplines", "content/helplines_in.json", {
+            "tele_manas":{"name":"Tele-MANAS","phone":"14416","alt":"1-800-891-4416"},
+            "kiran":{"name":"KIRAN","phone":"1800-599-0019"}
+        }, _validate_helplines)
+        .register("cues", "content/cues.json", {})
+        .register("suggestions", "content/suggestions.json", {})
+        .register("riddles", "content/riddles.json", {"riddles": RIDDLES}, _validate_riddles)
+        .derive("exercises_merged", ["exercises"], _merge_exercises)
+        .derive("suggest_index", ["exercises", "suggestions"], build_suggest_index)
+        .derive("matcher", ["cues"], risk.build_matcher)
+        .derive("riddle_bank", ["riddles"], lambda v: RiddleBank(v["riddles"])))
+
+# ---------- fixed replies ----------
+SMALL_TALK = {"aap kaise ho","kaise ho","tum kaise ho"}
+
+def small_talk_reply(msg: str, lang: str = "English") -> str | None:
+    """Canned answer for "kaise ho"-style greetings, or None."""
+    if msg.strip().lower().rstrip("?.! ") not in SMALL_TALK: return None
+    if lang == "हिन्दी": return "मैं ठीक हूँ — आपका शुक्रिया! आप कैसे हैं?"
+    if lang == "Hinglish": return "Main theek hoon — shukriya! Aap kaise ho?"
+    return "I’m doing well — thanks for asking! How are you?"
+
+def fallback_reply(lang: str = "English") -> str:
+    if lang == "हिन्दी": return "मैं आपकी बात सुन रहा/रही हूँ। आप अकेले नहीं हैं।"
+    if lang == "Hinglish": return "Main sun raha/rahi hoon. Aap akelay nahi ho."
+    return "Thanks for sharing. I’m here to listen."
+
+def crisis_reply(lang: str = "English") -> str:
+    if lang == "हिन्दी": return "आपने यह बताया, यह हिम्मत की बात है। अभी आपकी सुरक्षा सबसे ज़रूरी है — कृपया यहाँ दी गई हेल्पलाइन पर कॉल करें या किसी भरोसेमंद व्यक्ति से बात करें।"
+    if lang == "Hinglish": return "Aapne share kiya, yeh himmat ki baat hai. Abhi aapki safety sabse zaroori hai — please yahan di gayi helpline pe call karo ya kisi trusted insaan se baat karo."
+    return "I’m really glad you told me. Your safety matters most right now — please call one of the helplines shown here, or reach out to someone you trust."
+
+def reply_contents(msg: str, lang: str, context: str = "") -> list:
+    lang_instr = {
+        "English":"Reply in natural, supportive English.",
+        "हिन्दी":"Reply in Hindi (Devanagari). Keep it warm and simple.",
+        "Hinglish":"Reply in Hindi written in Latin script (Hinglish). Example: 'main theek hoon'. Keep tone warm."
+    }[lang]
+    ctx = f"{context}\n" if context else ""
+    return [{"role":"user","parts":[{"text": f"{SYSTEM}\n{lang_instr}\n{ctx}User: {msg}"}]}]
+
+# ---------- WHO-5 ----------
+def who5_score(answers: list[int]) -> int:
+    """Five 0–5 answers -> 0–100."""
+    return sum(answers) * 4
+
+class Engine:
+    def __init__(self, app_dir: Path = APP_DIR, *, api_key: str | None = None, deadline_s: float = 8.0,
+                 concurrency: int = 8, breaker_fails: int = 3, breaker_reset_s: float = 30.0,
+                 cache: LLMCache | None = None, data_dir: Path | None = None, http_options: dict | None = None,
+                 context_budget: int = 800, context_turns: int = 6, summarize_every: int = 6, lazy_init: bool = True,
+                 risk_window_s: float = 0.05, risk_max_batch: int = 16, risk_per_min: float = 0, risk_burst: int = 10):
+        self.app_dir, self.deadline_s = Path(app_dir), deadline_s
+        self.context_budget, self.context_turns, self.summarize_every = context_budget, context_turns, summarize_every
+        self.data_dir = Path(data_dir) if data_dir else self.app_dir / "data"
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.content = build_content(self.app_dir)
+        self.llm = GeminiGateway(api_key, deadline_s=deadline_s, max_concurrency=concurrency,
+                                 breaker=CircuitBreaker(breaker_fails, breaker_reset_s), http_options=http_options,
+                                 lazy=lazy_init)
+        bucket = TokenBucket(risk_per_min / 60, risk_burst) if risk_per_min > 0 else None
+        self.risk_scheduler = RiskScheduler(self.llm, window_s=risk_window_s, max_batch=risk_max_batch, bucket=bucket,
+                                            max_concurrency=max(1, concurrency // 2))
+        self.cache = cache if cache is not None else LLMCache()
+        self.mood = MoodStore(self.data_dir / "mood.sqlite", legacy_csv=self.data_dir / "mood_log.csv")
+        self._jobs = ThreadPoolExecutor(max_workers=2, thread_name_prefix="engine-bg")  # recaps, context summaries
+        self._recaps: OrderedDict[str, Future] = OrderedDict()
+        self._recap_lock = threading.Lock()
+        METRICS.source("llm", self._llm_metrics)
+        METRICS.source("risk", self._risk_metrics)
+        METRICS.source("cache", lambda: {f"{k}_total" if k in ("hits", "misses", "disk_hits") else k: v
+                                         for k, v in self.cache.stats().items()})
+
+    def _llm_metrics(self) -> dict:
+        s = self.llm.status()
+        return {"calls_total": s["calls"], "failures_total": s["failures"], "timeouts_total": s["timeouts"],
+                "rejected_total": s["rejected"], "breaker_open": int(s["state"] != "closed")}
+
+    def _risk_metrics(self) -> dict:
+        s = self.risk_scheduler.stats()
+        return {k if k in ("queue_depth", "inflight", "last_batch_size", "mean_batch_size") else f"{k}_total": v
+                for k, v in s.items()}
+
+    @classmethod
+    def from_env(cls, app_dir: Path = APP_DIR, api_key: str | None = None) -> "Engine":
+        """Settings from MANNMITRA_* environment variables (see README)."""
+        app_dir = Path(app_dir)
+        data_dir = Path(os.getenv("MANNMITRA_DATA_DIR") or app_dir / "data")  # mood log, caches, spill files
+        cache_disk = os.getenv("MANNMITRA_LLM_CACHE_DISK", "0") == "1"   # persist cache in data/llm_cache.sqlite
+        return cls(app_dir, data_dir=data_dir,
+                   api_key=api_key or os.getenv("GEMINI_API_KEY"),
+                   deadline_s=float(os.getenv("MANNMITRA_LLM_DEADLINE", "8")),      # per-call budget for chat turns
+                   concurrency=int(os.getenv("MANNMITRA_LLM_CONCURRENCY", "8")),   # Gemini calls in flight per process
+                   breaker_fails=int(os.getenv("MANNMITRA_BREAKER_FAILS", "3")),   # consecutive failures before pausing Gemini
+                   breaker_reset_s=float(os.getenv("MANNMITRA_BREAKER_RESET", "30")),  # pause length before a trial call
+                   cache=LLMCache(ttl_s=float(os.getenv("MANNMITRA_LLM_CACHE_TTL", str(6 * 3600))),
+                                  db_path=data_dir / "llm_cache.sqlite" if cache_disk else None),
+                   context_budget=int(os.getenv("MANNMITRA_CONTEXT_BUDGET", "800")),  # tokens of summary + recent turns per reply
+                   context_turns=int(os.getenv("MANNMITRA_CONTEXT_TURNS", "6")),      # newest turns always kept verbatim
+                   summarize_every=int(os.getenv("MANNMITRA_SUMMARY_EVERY", "6")),    # fold older turns into the summary in batches of K
+                   lazy_init=os.getenv("MANNMITRA_LAZY_INIT", "1") == "1",           # build the Gemini client on first call
+                   risk_window_s=float(os.getenv("MANNMITRA_RISK_WINDOW_MS", "50")) / 1000,  # gather risk checks this long into one call
+                   risk_max_batch=int(os.getenv("MANNMITRA_RISK_BATCH", "16")),      # messages per risk-check call
+                   risk_per_min=float(os.getenv("MANNMITRA_RISK_PER_MIN", "0")),     # risk-check calls per minute (0 = no limit)
+                   risk_burst=int(os.getenv("MANNMITRA_RISK_BURST", "10")))          # calls allowed at once before the rate applies
+
+    @property
+    def matcher(self):
+        return self.content.get("matcher")  # rebuilt only when content/cues.json changes
+
+    # ---------- replies ----------
+    def gemini_reply(self, msg: str, lang: str = "English", context: str = "") -> str:
+        if not self.llm.enabled:
+            return fallback_reply(lang)
+        key = f"{context}\n{msg}" if context else msg
+        cached = self.cache.get("reply", lang, key)
+        if cached is not None:
+            return cached
+        try:
+            text = self.llm.generate(reply_contents(msg, lang, context)).strip()
+            if text: self.cache.put("reply", lang, key, text)
+            return text or ("Main theek hoon." if lang!="English" else "I’m here for you.")
+        except CircuitOpen:
+            return fallback_reply(lang)
+        except Exception as e:
+            return f"(Temporary issue: {e}) I’m still here to support you."
+
+    def gemini_reply_stream(self, msg: str, lang: str = "English", context: str = ""):
+        """Same reply as `gemini_reply`, yielded chunk by chunk as the model produces it."""
+        if not self.llm.enabled:
+            yield fallback_reply(lang); return
+        key = f"{context}\n{msg}" if context else msg
+        cached = self.cache.get("reply", lang, key)
+        if cached is not None:
+            yield cached; return
+        parts = []
+        try:
+            for part in self.llm.stream(reply_contents(msg, lang, context)):
+                if part:
+                    parts.append(part)
+                    yield part
+        except CircuitOpen:
+            yield fallback_reply(lang)
+            return
+        except Exception as e:
+            yield (" " if parts else "") + f"(Temporary issue: {e}) I’m still here to support you."
+            return
+        text = "".join(parts).strip()
+        if text: self.cache.put("reply", lang, key, text)
+        else: yield "Main theek hoon." if lang!="English" else "I’m here for you."
+
+    # ---------- risk & suggestions ----------
+    def keyword_risk(self, text: str) -> int:
+        return risk.keyword_risk(text, self.matcher)
+
+    def classify_risk(self, text: str) -> int:
+        return risk.classify_risk(text, self.matcher, self.llm, self.cache, self.risk_scheduler)
+
+    def choose_suggestion(self, user_text: str):
+        return risk.choose_suggestion(user_text, self.matcher, self.content.get("suggest_index"))
+
+    def chat_turn(self, msg: str, lang: str = "English", render=None,
+                  context: ConversationContext | None = None) -> tuple[TurnResult, dict | None]:
+        """One user message -> (turn result, suggestion). With `render` (e.g. st.write_stream)
+        the reply is streamed through it; otherwise it is produced in one piece. With a
+        `context` (see new_context) the reply prompt carries the conversation so far."""
+        common = dict(risk_fn=self.classify_risk, keyword_risk_fn=self.keyword_risk,
+                      fallback_reply=fallback_reply(lang), crisis_reply=crisis_reply(lang), deadline_s=self.deadline_s)
+        ctx = context.render() if context is not None else ""
+        if context is not None:
+            context.record_prompt(reply_contents(msg, lang, ctx)[0]["parts"][0]["text"], ctx)
+        if render is not None:
+            turn = run_streaming_turn(msg, stream_fn=lambda m: self.gemini_reply_stream(m, lang, ctx), render=render, **common)
+        else:
+            turn = run_turn(msg, reply_fn=lambda m: self.gemini_reply(m, lang, ctx), **common)
+        if context is not None:
+            context.add("user", msg)
+            context.add("assistant", turn.reply)
+            if (batch := context.due()) is not None:
+                self._jobs.submit(self._fold_context, context, batch)
+        METRICS.observe("chat.risk", turn.risk_s)
+        if not turn.suppressed: METRICS.observe("chat.reply", turn.reply_s)
+        if turn.ttft_s is not None: METRICS.observe("chat.first_token", turn.ttft_s)
+        METRICS.observe("chat.turn", turn.wall_s)
+        if turn.risk >= 2: return turn, None
+        with METRICS.time("chat.suggestion"):
+            return turn, self.choose_suggestion(msg)
+
+    # ---------- conversation context ----------
+    def new_context(self) -> ConversationContext:
+        return ConversationContext(self.context_budget, self.context_turns, self.summarize_every)
+
+    def _fold_context(self, context: ConversationContext, batch: list[tuple[str, str]]):
+        """Fold `batch` into the running summary; falls back to an extractive gist offline."""
+        with METRICS.time("context.summarize"):
+            summary = ""
+            if self.llm.enabled:
+                try:
+                    pr = summary_prompt(context.summary, batch, context.summary_tokens)
+                    summary = self.llm.generate([{"role":"user","parts":[{"text":pr}]}]).strip()
+                except Exception:
+                    summary = ""
+            context.fold(batch, summary or fallback_summary(context.summary, batch, context.summary_tokens))
+
+    # ---------- recap ----------
+    def build_recap(self, history, lang: str) -> str:
+        return self._recap_text(history.last_user(3), lang)[0]
+
+    def _recap_text(self, last_user: list[str], lang: str) -> tuple[str, bool]:
+        """(recap, final); not final when Gemini failed and the offline recap stood in."""
+        with METRICS.time("recap.build"):
+            points = "\n".join(f"- {x}" for x in last_user) if last_user else "- (no details)"
+            base = f"Session recap ({lang}):\n{points}\n\nTiny plan for today:\n• 3 cycles 4-7-8\n• One kind line to yourself\n• 10-min walk"
+            if self.llm.enabled and last_user:
+                cached = self.cache.get("recap", lang, "\n".join(last_user))
+                if cached is not None: return cached, True
+                try:
+                    pr = f"{SYSTEM}\nSummarize in {lang} ≤60 words, then 3-bullet plan. Return plain text.\n" + "\n".join(last_user)
+                    text = self.llm.generate([{"role":"user","parts":[{"text":pr}]}]).strip()
+                    if text: self.cache.put("recap", lang, "\n".join(last_user), text)
+                    return text or base, bool(text)
+                except Exception: return base, False
+            return base, True
+
+    def start_recap(self, history, lang: str) -> str:
+        """Queue a recap on the worker pool and return its key; an unchanged chat reuses the job."""
+        last_user = history.last_user(3)  # read on the caller's thread; the session keeps appending
+        key = hashlib.sha256("\x1f".join([lang, *last_user]).encode("utf-8")).hexdigest()
+        with self._recap_lock:
+            job = self._recaps.get(key)
+            if job is None or (job.done() and (job.exception() is not None or not job.result()[1])):
+                job = self._recaps[key] = self._jobs.submit(self._recap_text, last_user, lang)
+            self._recaps.move_to_end(key)
+            while len(self._recaps) > RECAP_MEMO: self._recaps.popitem(last=False)
+        return key
+
+    def recap_job(self, key: str | None) -> Future | None:
+        """The job behind `key` (result: (text, final)), or None if unknown/evicted."""
+        return self._recaps.get(key) if key else None
+
+    # ---------- WHO-5 & mood log ----------
+    def save_checkin(self, answers: list[int], note: str = "", user_id: str = LEGACY_USER) -> int:
+        with METRICS.time("who5.save"):
+            total = who5_score(answers)
+            self.mood.add(total, note, user_id=user_id)
+        return total
@@ -0,0 +1,201 @@
+"""Process-wide Gemini gateway: one shared client, per-call deadlines, bounded
+concurrency and a circuit breaker.
+
+Callers catch `LLMUnavailable` (breaker open, no free slot, deadline passed or
+upstream error) and use their own offline fallback text. A slot is held for as
+long as its upstream call really runs, even past the caller's deadline (the
+genai client has no request timeout to enforce), so hung calls reduce
+capacity instead of hiding behind it, and calls with no free slot are
+refused at once rather than queued behind them.
+
+With `lazy=True` (the default) `google.genai` is imported and the client built
+on the first call, so processes and sessions that never chat don't pay ~0.6 s
+for it at startup; `warm()` does it ahead of time off the request path.
+"""
+import importlib.util, queue, threading, time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from metrics import METRICS
+
+MODEL = "gemini-2.5-flash-lite"
+
+class LLMUnavailable(Exception):
+    pass
+
+class CircuitOpen(LLMUnavailable):
+    pass
+
+class CircuitBreaker:
+    """closed -> open after `fail_threshold` consecutive failures; after `reset_after_s`
+    one trial call is let through (half-open) and its outcome closes or re-opens it."""
+
+    def __init__(self, fail_threshold: int = 3, reset_after_s: float = 30.0):
+        self.fail_threshold, self.reset_after_s = fail_threshold, reset_after_s
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None: return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_after_s else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed": return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures, self.opened_at, self._trial = 0, None, False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.fail_threshold:
+                self.opened_at, self._trial = time.monotonic(), False
+
+    def release_trial(self):
+        """The trial call ended without a verdict (e.g. a stream closed early): let another call try."""
+        with self._lock:
+            self._trial = False
+
+    def retry_in_s(self) -> float:
+        return 0.0 if self.opened_at is None else max(0.0, self.reset_after_s - (time.monotonic() - self.opened_at))
+
+class GeminiGateway:
+    def __init__(self, api_key: str | None, *, model: str = MODEL, deadline_s: float = 8.0,
+                 max_concurrency: int = 8, breaker: CircuitBreaker | None = None, http_options: dict | None = None,
+                 lazy: bool = True):
+        self.model, self.deadline_s = model, deadline_s
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="gemini")
+        self.calls = self.failures = self.timeouts = self.rejected = 0
+        self._api_key, self._http_options = api_key, http_options
+        self._client = None
+        self._client_lock = threading.Lock()
+        try:  # finds the package without importing it
+            self._available = bool(api_key) and importlib.util.find_spec("google.genai") is not None
+        except ImportError:
+            self._available = False
+        if not lazy:
+            self.warm()
+
+    @property
+    def enabled(self) -> bool:
+        return self._available
+
+    @property
+    def client(self):
+        """The genai client, imported and built on first use; None if that failed."""
+        if self._client is None and self._available:
+            with self._client_lock:
+                if self._client is None and self._available:
+                    try:
+                        t0 = time.perf_counter()
+                        from google import genai
+                        self._client = genai.Client(api_key=self._api_key, http_options=self._http_options)
+                        METRICS.observe("llm.client_init", time.perf_counter() - t0)
+                    except Exception:
+                        self._available = False
+        return self._client
+
+    def warm(self) -> bool:
+        """Build the client now (e.g. on a background thread after first paint)."""
+        return self.client is not None
+
+    def _acquire(self, deadline_s: float) -> float:
+        """Take a free worker slot and check the breaker; returns the absolute deadline.
+
+        Never waits for a slot: slots are given back only when the upstream call itself
+        returns, so when all are taken by hung calls, waiting would only time out later."""
+        if self.client is None:
+            raise LLMUnavailable("no client")
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise LLMUnavailable("all Gemini slots busy")
+        if not self.breaker.allow():
+            self._slots.release()
+            self.rejected += 1
+            raise CircuitOpen(f"circuit open, retry in {self.breaker.retry_in_s():.0f}s")
+        self.calls += 1
+        return time.monotonic() + deadline_s
+
+    def _submit(self, fn, *args, **kwargs):
+        """Run `fn` on a worker; its slot is released when it returns, not when the caller gives up."""
+        try:
+            fut = self._pool.submit(fn, *args, **kwargs)
+        except RuntimeError:  # pool shut down (interpreter exit)
+            self._slots.release()
+            raise
+        fut.add_done_callback(lambda _: self._slots.release())
+        return fut
+
+    def _failed(self, err: Exception, timed_out: bool = False):
+        self.failures += 1
+        self.timeouts += timed_out
+        self.breaker.record_failure()
+        raise LLMUnavailable(str(err) or type(err).__name__) from err
+
+    def generate(self, contents, deadline_s: float | None = None) -> str:
+        until = self._acquire(deadline_s or self.deadline_s)
+        t0 = time.perf_counter()
+        fut = None
+        try:
+            fut = self._submit(self.client.models.generate_content, model=self.model, contents=contents)
+            resp = fut.result(timeout=max(0.0, until - time.monotonic()))
+        except FutureTimeout as e:
+            fut.cancel()  # only helps if it never started; a running call keeps its slot until it returns
+            self._failed(e, timed_out=True)
+        except Exception as e:
+            self._failed(e)
+        finally:
+            METRICS.observe("llm.generate", time.perf_counter() - t0)
+        self.breaker.record_success()
+        return resp.text or ""
+
+    def stream(self, contents, deadline_s: float | None = None):
+        """Yield text chunks; the whole stream must finish within the deadline."""
+        until = self._acquire(deadline_s or self.deadline_s)
+        chunks: queue.Queue = queue.Queue()
+        done, stop = object(), threading.Event()
+
+        def pump():
+            try:
+                for chunk in self.client.models.generate_content_stream(model=self.model, contents=contents):
+                    if stop.is_set(): return  # caller gone: stop reading upstream, free the slot
+                    chunks.put(chunk.text or "")
+                chunks.put(done)
+            except Exception as e:
+                chunks.put(e)
+        t0 = time.perf_counter()
+        try:
+            fut = self._submit(pump)
+        except RuntimeError as e:
+            self._failed(e)
+        try:
+            while True:
+                try:
+                    item = chunks.get(timeout=max(0.0, until - time.monotonic()))
+                except queue.Empty:
+                    self._failed(TimeoutError("stream deadline passed"), timed_out=True)
+                if item is done: break
+                if isinstance(item, Exception): self._failed(item)
+                yield item
+        except GeneratorExit:
+            self.breaker.release_trial()  # the caller stopped reading; neither success nor failure
+            raise
+        finally:
+            stop.set(); fut.cancel()
+            METRICS.observe("llm.stream", time.perf_counter() - t0)
+        self.breaker.record_success()
+
+    def status(self) -> dict:
+        return {"enabled": self.enabled, "state": self.breaker.state, "retry_in_s": self.breaker.retry_in_s(),
+                "calls": self.calls, "failures": self.failures, "timeouts": self.timeouts, "rejected": self.rejected}
@@ -0,0 +1,102 @@
+"""Per-session chat history: a fixed-size in-memory ring, older turns spilled to disk.
+
+Spilled turns go to one JSON-lines file per session under data/history/; only
+their byte offsets stay in memory, so any page can be read back with one seek.
+A session's file is deleted when its history is cleared or garbage-collected
+(the session expired); `start_sweeper` removes anything left behind, e.g.
+after a crash, on an hourly timer. That timer goes by mtime, so it can also
+take the file of a tab left idle for a day; the history then notices the file
+is gone or was started afresh and treats the older turns as expired.
+"""
+import json, os, threading, time, weakref
+from collections import deque
+from pathlib import Path
+
+from metrics import METRICS
+
+class ChatHistory:
+    def __init__(self, spill_path: Path, ring_size: int = 40):
+        self.spill_path = Path(spill_path)
+        self._ring: deque[tuple[str, str]] = deque()
+        self.ring_size = ring_size
+        self._offsets: list[int] = []  # byte offset of each spilled turn
+        self._end = 0  # spill file size after our last write
+        weakref.finalize(self, self.spill_path.unlink, missing_ok=True)  # session gone -> transcript gone
+
+    def __len__(self) -> int:
+        return len(self._offsets) + len(self._ring)
+
+    def append(self, role: str, text: str):
+        if len(self._ring) >= self.ring_size:
+            self._spill(self._ring.popleft())
+        self._ring.append((role, text))
+
+    def _spill(self, turn: tuple[str, str]):
+        with METRICS.time("history.spill"):
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spill_path, "ab") as f:
+                if f.tell() != self._end: self._expire()  # swept since the last spill: a fresh file
+                self._offsets.append(f.tell())
+                f.write(json.dumps(turn, ensure_ascii=False).encode("utf-8") + b"\n")
+                self._end = f.tell()
+
+    def _expire(self):
+        """The spill file was swept: forget the turns it held."""
+        self._offsets.clear()
+        self._end = 0
+
+    def page(self, start: int, stop: int) -> list[tuple[str, str]]:
+        """Turns `start`..`stop` (absolute indices, oldest = 0), reading disk only if needed."""
+        start, stop = max(0, start), min(len(self), stop)
+        out, spilled = [], len(self._offsets)
+        if start < spilled:
+            try:
+                with open(self.spill_path, "rb") as f:
+                    if os.fstat(f.fileno()).st_size != self._end:
+                        self._expire()
+                    else:
+                        f.seek(self._offsets[start])
+                        for _ in range(start, min(stop, spilled)):
+                            out.append(tuple(json.loads(f.readline())))
+            except FileNotFoundError:
+                self._expire()
+        ring = list(self._ring)
+        out.extend(ring[max(0, start - spilled): max(0, stop - spilled)])
+        return out
+
+    def recent(self, n: int) -> list[tuple[str, str]]:
+        return self.page(len(self) - n, len(self))
+
+    def last_user(self, k: int) -> list[str]:
+        """The last `k` user messages, oldest first."""
+        found, stop = [], len(self)
+        while stop > 0 and len(found) < k:
+            chunk = self.page(stop - self.ring_size, stop)
+            found = [t for r, t in chunk if r == "user"] + found
+            stop -= self.ring_size
+        return found[-k:]
+
+    def clear(self):
+        self._ring.clear(); self._expire()
+        self.spill_path.unlink(missing_ok=True)
+
+def sweep(spill_dir: Path, max_age_s: float = 24 * 3600):
+    """Delete spill files of sessions idle for longer than `max_age_s`."""
+    if not Path(spill_dir).is_dir():
+        return
+    cutoff = time.time() - max_age_s
+    for p in Path(spill_dir).glob("*.jsonl"):
+        try:
+            if p.stat().st_mtime < cutoff: os.remove(p)
+        except OSError:
+            pass
+
+def start_sweeper(spill_dir: Path, max_age_s: float = 24 * 3600, every_s: float = 3600) -> threading.Thread:
+    """`sweep` now and then every `every_s` on a daemon thread, for the life of the process."""
+    def loop():
+        while True:
+            sweep(spill_dir, max_age_s)
+            time.sleep(every_s)
+    t = threading.Thread(target=loop, daemon=True, name="history-sweep")
+    t.start()
+    return t
@@ -0,0 +1,75 @@
+"""Shared response cache for LLM calls: in-memory LRU + TTL, optional SQLite tier.
+
+Keys are built from the prompt kind, the reply language and the normalized user
+text, then hashed, so the disk tier never stores raw messages as keys.
+"""
+import hashlib, json, re, sqlite3, sys, threading, time
+from collections import OrderedDict
+from pathlib import Path
+
+def normalize(text: str) -> str:
+    """Case-fold, collapse whitespace and drop edge punctuation ("Stressed!! " == "stressed")."""
+    return re.sub(r"\s+", " ", text.strip().lower()).strip(" ?.!,;:~-")
+
+class LLMCache:
+    def __init__(self, max_items: int = 2048, max_bytes: int = 8 << 20, ttl_s: float = 6 * 3600,
+                 db_path: Path | None = None):
+        self.max_items, self.max_bytes, self.ttl_s = max_items, max_bytes, ttl_s
+        self._mem: OrderedDict[str, tuple[float, object, int]] = OrderedDict()  # key -> (stored_at, value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.disk_hits = 0
+        self._db = None
+        if db_path is not None:
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT, stored_at REAL)")
+            self._db.execute("DELETE FROM llm_cache WHERE stored_at < ?", (time.time() - ttl_s,))
+
+    @staticmethod
+    def key(kind: str, lang: str, text: str) -> str:
+        return hashlib.sha256(f"{kind}\x1f{lang}\x1f{normalize(text)}".encode("utf-8")).hexdigest()
+
+    def get(self, kind: str, lang: str, text: str):
+        k, now = self.key(kind, lang, text), time.time()
+        with self._lock:
+            item = self._mem.get(k)
+            if item and now - item[0] <= self.ttl_s:
+                self._mem.move_to_end(k)
+                self.hits += 1
+                return item[1]
+            if item:
+                self._drop(k)
+            if self._db is not None:
+                row = self._db.execute("SELECT value, stored_at FROM llm_cache WHERE key=?", (k,)).fetchone()
+                if row and now - row[1] <= self.ttl_s:
+                    value = json.loads(row[0])
+                    self._store(k, value, row[1])
+                    self.hits += 1; self.disk_hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, kind: str, lang: str, text: str, value):
+        k, now = self.key(kind, lang, text), time.time()
+        with self._lock:
+            self._store(k, value, now)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO llm_cache VALUES (?,?,?)", (k, json.dumps(value), now))
+
+    def _store(self, k, value, stored_at):
+        if k in self._mem:
+            self._drop(k)
+        size = sys.getsizeof(value) + sys.getsizeof(k)
+        self._mem[k] = (stored_at, value, size)
+        self._bytes += size
+        while self._mem and (len(self._mem) > self.max_items or self._bytes > self.max_bytes):
+            self._drop(next(iter(self._mem)))
+
+    def _drop(self, k):
+        self._bytes -= self._mem.pop(k)[2]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "disk_hits": self.disk_hits,
+                    "items": len(self._mem), "bytes": self._bytes}
@@ -0,0 +1,120 @@
+"""Simulate N concurrent chat users against the headless Engine and a local Gemini stub.
+
+    python loadtest/run.py --users 50 --turns 10 --latency-ms 400 --error-rate 0.02
+    python loadtest/run.py --users 20 --stream --stub-url http://127.0.0.1:8765/
+
+Each user sends `--turns` messages (a mix of plain, cue-bearing and crisis
+texts, made unique so the response cache does not short-circuit the model,
+except for a `--shared` fraction sent verbatim, as a class prompted with the
+same question would) and optionally a WHO-5 check-in. Mood rows go to a temporary data dir.
+Each user keeps a rolling conversation context, as a browser session does.
+Prints p50/p95/p99 turn latency, throughput, prompt size early vs. late
+in the sessions, and how many risk checks were coalesced, batched or refused
+by the quota.
+"""
+import argparse, random, statistics, sys, tempfile, threading, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from engine import Engine                  # noqa: E402
+from llm_cache import LLMCache             # noqa: E402
+from stub_gemini import StubConfig, serve  # noqa: E402
+
+MESSAGES = [
+    "I have an exam tomorrow and feel so stressed",
+    "kal se neend nahi aa rahi, bahut tension hai",
+    "I keep overthinking everything my friends say",
+    "bored and can't focus on anything today",
+    "feeling very sad and lonely after moving to a new city",
+    "today was okay, just wanted to talk",
+    "मुझे बहुत घबराहट हो रही है",
+    "I want to end my life",
+]
+
+def pct(xs: list[float], q: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(q / 100 * (len(xs) - 1))))] if xs else 0.0
+
+def user(engine: Engine, uid: int, a, out: list, lock: threading.Lock):
+    rnd = random.Random(uid)
+    lang = rnd.choice(["English", "Hinglish", "हिन्दी"])
+    ctx = engine.new_context() if not a.no_context else None
+    for t in range(a.turns):
+        msg = rnd.choice(MESSAGES) if rnd.random() < a.shared else f"{rnd.choice(MESSAGES)} ({uid}.{t})"
+        t0 = time.perf_counter()
+        turn, _ = engine.chat_turn(msg, lang, render=(lambda chunks: "".join(chunks)) if a.stream else None, context=ctx)
+        row = {"s": time.perf_counter() - t0, "timed_out": bool(turn.timed_out), "ttft_s": turn.ttft_s,
+               "turn": t, "prompt_tokens": ctx.last_prompt_tokens if ctx else 0}
+        if a.checkin_every and (t + 1) % a.checkin_every == 0:
+            engine.save_checkin([rnd.randint(0, 5) for _ in range(5)], "loadtest", user_id=f"load{uid}")
+            engine.mood.daily(14, user_id=f"load{uid}")  # the chart query that follows a save
+        with lock: out.append(row)
+        if a.think_ms: time.sleep(rnd.uniform(0.5, 1.5) * a.think_ms / 1000)
+
+def main():
+    ap = argparse.ArgumentParser(description="MannMitra chat load test")
+    ap.add_argument("--users", type=int, default=20)
+    ap.add_argument("--turns", type=int, default=10, help="messages per user")
+    ap.add_argument("--think-ms", type=float, default=0, help="mean pause between a user's messages")
+    ap.add_argument("--stream", action="store_true", help="stream replies (as with MANNMITRA_STREAM=1)")
+    ap.add_argument("--no-context", action="store_true", help="send only the current message, as before rolling context")
+    ap.add_argument("--checkin-every", type=int, default=5, help="WHO-5 save every N turns (0 = never)")
+    ap.add_argument("--latency-ms", type=float, default=300)
+    ap.add_argument("--jitter-ms", type=float, default=50)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--stub-url", help="use a running stub_gemini.py instead of an in-process one")
+    ap.add_argument("--concurrency", type=int, default=8, help="Gemini calls in flight (MANNMITRA_LLM_CONCURRENCY)")
+    ap.add_argument("--deadline", type=float, default=8.0, help="per-call budget in seconds")
+    ap.add_argument("--breaker-fails", type=int, default=3)
+    ap.add_argument("--shared", type=float, default=0.0, help="fraction of messages sent verbatim (identical across users)")
+    ap.add_argument("--risk-window-ms", type=float, default=50, help="risk-check batching window (MANNMITRA_RISK_WINDOW_MS)")
+    ap.add_argument("--risk-batch", type=int, default=16, help="messages per risk-check call (MANNMITRA_RISK_BATCH)")
+    ap.add_argument("--risk-per-min", type=float, default=0, help="risk-check call quota per minute, 0 = none")
+    ap.add_argument("--risk-burst", type=int, default=10)
+    a = ap.parse_args()
+
+    stub = None
+    if a.stub_url:
+        url = a.stub_url
+    else:
+        server, stub = serve(cfg=StubConfig(a.latency_ms, a.jitter_ms, a.error_rate))
+        url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        engine = Engine(api_key="stub", http_options={"base_url": url}, data_dir=data_dir,
+                        deadline_s=a.deadline, concurrency=a.concurrency, breaker_fails=a.breaker_fails,
+                        cache=LLMCache(), risk_window_s=a.risk_window_ms / 1000, risk_max_batch=a.risk_batch,
+                        risk_per_min=a.risk_per_min, risk_burst=a.risk_burst)
+        engine.llm.warm()  # the client is built lazily; keep its one-off import out of the turn latencies
+        rows, lock = [], threading.Lock()
+        threads = [threading.Thread(target=user, args=(engine, i, a, rows, lock)) for i in range(a.users)]
+        t0 = time.perf_counter()
+        for th in threads: th.start()
+        for th in threads: th.join()
+        wall = time.perf_counter() - t0
+        mood_rows = engine.mood.count()
+
+    lat = [r["s"] * 1e3 for r in rows]
+    ttft = [r["ttft_s"] * 1e3 for r in rows if r["ttft_s"] is not None]
+    print(f"users={a.users} turns={len(rows)} wall={wall:.2f}s throughput={len(rows) / wall:.1f} turns/s")
+    print(f"turn latency ms  p50={pct(lat, 50):.0f} p95={pct(lat, 95):.0f} p99={pct(lat, 99):.0f} "
+          f"mean={statistics.fmean(lat):.0f} max={max(lat):.0f}")
+    if ttft:
+        print(f"first token ms   p50={pct(ttft, 50):.0f} p95={pct(ttft, 95):.0f} p99={pct(ttft, 99):.0f}")
+    if not a.no_context and a.turns >= 4:
+        q = max(1, a.turns // 4)
+        first, last = [r for r in rows if r["turn"] < q], [r for r in rows if r["turn"] >= a.turns - q]
+        print(f"prompt tokens    first {q} turns mean={statistics.fmean(r['prompt_tokens'] for r in first):.0f} · "
+              f"last {q} turns mean={statistics.fmean(r['prompt_tokens'] for r in last):.0f} "
+              f"(latency p50 {pct([r['s'] * 1e3 for r in first], 50):.0f} -> {pct([r['s'] * 1e3 for r in last], 50):.0f} ms)")
+    print(f"timed out turns={sum(r['timed_out'] for r in rows)} mood rows={mood_rows}")
+    print(f"gateway {engine.llm.status()}")
+    rs = engine.risk_scheduler.stats()
+    print(f"risk checks      sent={rs['submitted']} coalesced={rs['coalesced']} model calls={rs['batches']} "
+          f"mean batch={rs['mean_batch_size']:.1f} rate-limited={rs['rate_limited']} failed={rs['failed']} abandoned={rs['abandoned']}")
+    if stub: print(f"stub requests={stub.requests} errors={stub.errors}")
+
+if __name__ == "__main__":
+    main()
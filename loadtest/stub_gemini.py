@@ -0,0 +1,104 @@
+"""Local stand-in for the Gemini REST API, for load tests.
+
+Answers ``models/<model>:generateContent`` and ``:streamGenerateContent``
+(SSE) with canned text after a configurable delay, failing a configurable
+fraction of calls with HTTP 503. Point a client at it with
+``genai.Client(api_key="stub", http_options={"base_url": url})``.
+
+    python loadtest/stub_gemini.py --port 8765 --latency-ms 400 --jitter-ms 100 --error-rate 0.02
+"""
+import argparse, json, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = "That sounds like a lot to carry. Let's take one slow breath together — what feels heaviest right now?"
+
+class StubConfig:
+    def __init__(self, latency_ms: float = 300, jitter_ms: float = 50, error_rate: float = 0.0, chunks: int = 4):
+        self.latency_ms, self.jitter_ms, self.error_rate, self.chunks = latency_ms, jitter_ms, error_rate, chunks
+        self.requests = self.errors = 0
+        self._lock = threading.Lock()
+
+    def count(self, failed: bool):
+        with self._lock:
+            self.requests += 1
+            self.errors += failed
+
+def _answer(prompt: str) -> str:
+    if prompt.startswith("Classify self-harm risk for each message"):
+        n = len(json.loads(prompt[prompt.index("Messages: ") + len("Messages: "):]))
+        return json.dumps({"risks": [random.choice([0, 0, 0, 1]) for _ in range(n)]})
+    if prompt.startswith("Classify self-harm risk"):
+        return json.dumps({"risk": random.choice([0, 0, 0, 1])})
+    return REPLY
+
+def _payload(text: str) -> dict:
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}]}
+
+def make_handler(cfg: StubConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, code: int, body: bytes, ctype: str = "application/json"):
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            prompt = "".join(p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", []))
+            delay = max(0.0, random.gauss(cfg.latency_ms, cfg.jitter_ms)) / 1000
+            failed = random.random() < cfg.error_rate
+            cfg.count(failed)
+            if failed:
+                time.sleep(delay)
+                return self._send(503, json.dumps({"error": {"code": 503, "message": "stub overloaded", "status": "UNAVAILABLE"}}).encode())
+            text = _answer(prompt)
+            if ":streamGenerateContent" not in self.path:
+                time.sleep(delay)
+                return self._send(200, json.dumps(_payload(text)).encode())
+            # SSE: first chunk after ~half the latency, the rest spread over the remainder
+            words = text.split(" ")
+            step = max(1, len(words) // cfg.chunks)
+            parts = [" ".join(words[i:i + step]) + " " for i in range(0, len(words), step)]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            time.sleep(delay / 2)
+            for part in parts:
+                self.wfile.write(f"data: {json.dumps(_payload(part))}\r\n\r\n".encode())
+                self.wfile.flush()
+                time.sleep(delay / 2 / len(parts))
+            self.close_connection = True
+    return Handler
+
+def serve(host: str = "127.0.0.1", port: int = 0, cfg: StubConfig | None = None) -> tuple[ThreadingHTTPServer, StubConfig]:
+    """Start the stub on a daemon thread; port 0 picks a free one (see server.server_address)."""
+    cfg = cfg or StubConfig()
+    server = ThreadingHTTPServer((host, port), make_handler(cfg))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="stub-gemini").start()
+    return server, cfg
+
+def main():
+    ap = argparse.ArgumentParser(description="Local Gemini stub")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=300)
+    ap.add_argument("--jitter-ms", type=float, default=50)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    a = ap.parse_args()
+    server, cfg = serve(a.host, a.port, StubConfig(a.latency_ms, a.jitter_ms, a.error_rate))
+    print(f"stub Gemini on http://{a.host}:{server.server_address[1]}/ (Ctrl+C to stop)")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
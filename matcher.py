@@ -0,0 +1,85 @@
+"""Single-pass cue matcher (Aho-Corasick) for risk keywords and suggestion rules.
+
+Cues are literal phrases. A leading or trailing ``\\b`` asks for a word
+boundary on that side, like the regexes the rules used to be written in:
+``\\banxious\\b`` is a whole word, ``\\boverwhelm`` also matches "overwhelmed",
+and ``tension`` matches anywhere. Text and cues are lower-cased and curly
+apostrophes folded, so one ``can't`` cue covers ``can’t`` too.
+"""
+from collections import deque
+from functools import lru_cache
+
+_FOLD = str.maketrans({"’": "'", "‘": "'", "`": "'"})
+
+def _fold(s: str) -> str:
+    return s.lower().translate(_FOLD)
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+class CueMatcher:
+    """Finds every cue of every category in one scan over the text.
+
+    `cues` maps a category name to its cue list; `scan` returns
+    ``{category: [matched cues]}`` for the categories that fired.
+    """
+
+    def __init__(self, cues: dict[str, list[str]], cache_size: int = 1024):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[tuple]] = [[]]
+        self.size = 0
+        for cat, items in cues.items():
+            for raw in items:
+                self._add(cat, raw)
+        self._link()
+        # the chat turn asks for risk and suggestions separately; scan each message once
+        self.scan = lru_cache(maxsize=cache_size)(self._scan)
+
+    def _add(self, cat: str, raw: str):
+        lb, rb = raw.startswith("\\b"), raw.endswith("\\b")
+        word = _fold(raw[2 if lb else 0: len(raw) - 2 if rb else len(raw)])
+        if not word:
+            return
+        node = 0
+        for ch in word:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({}); self._fail.append(0); self._out.append([])
+                self._goto[node][ch] = nxt
+            node = nxt
+        self._out[node].append((cat, raw, len(word), lb, rb))
+        self.size += 1
+
+    def _link(self):
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0) if goto[f].get(ch, 0) != nxt else 0
+                out[nxt] = out[nxt] + out[fail[nxt]]
+
+    def _scan(self, text: str) -> dict[str, list[str]]:
+        goto, fail, out = self._goto, self._fail, self._out
+        tl = _fold(text)
+        n, node, hits = len(tl), 0, {}
+        for i, ch in enumerate(tl):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for cat, raw, size, lb, rb in out[node]:
+                start = i - size + 1
+                if lb and start > 0 and _is_word(tl[start - 1]): continue
+                if rb and i + 1 < n and _is_word(tl[i + 1]): continue
+                found = hits.setdefault(cat, [])
+                if raw not in found: found.append(raw)
+        return hits
+
+    def categories(self, text: str) -> set[str]:
+        return set(self.scan(text))
@@ -0,0 +1,121 @@
+"""In-process latency histograms, exported in Prometheus text format.
+
+`METRICS` is shared by everything in the process (engine, gateway, every
+session). Time a stage with `with METRICS.time("chat.risk"):` or record a
+measured duration with `METRICS.observe`. Counters other objects already keep
+(Gemini calls, cache hits) are read only at export time via `source`.
+"""
+import bisect, os, threading, time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    def __init__(self, buckets: tuple = BUCKETS, recent: int = 512):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum, self.count = 0.0, 0
+        self.recent: deque[float] = deque(maxlen=recent)  # raw samples behind the live percentiles
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        self.recent.append(seconds)
+
+    def quantile(self, q: float) -> float:
+        xs = sorted(self.recent)
+        return xs[min(len(xs) - 1, int(q * len(xs)))] if xs else 0.0
+
+class Metrics:
+    def __init__(self, prefix: str = "mannmitra"):
+        self.prefix = prefix
+        self._hists: dict[str, Histogram] = {}
+        self._sources = {}  # name -> fn
+        self._lock = threading.Lock()
+        self._written_at = 0.0
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            h = self._hists.get(stage) or self._hists.setdefault(stage, Histogram())
+            h.observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - t0)
+
+    def source(self, name: str, fn):
+        """`fn()` -> {metric: number}, read at export; names ending in `_total` are counters."""
+        self._sources[name] = fn
+
+    def snapshot(self) -> dict:
+        """{stage: count, p50/p95 over the recent samples, mean over all} in seconds."""
+        with self._lock:
+            return {s: {"count": h.count, "p50_s": h.quantile(0.5), "p95_s": h.quantile(0.95),
+                        "mean_s": h.sum / h.count if h.count else 0.0} for s, h in sorted(self._hists.items())}
+
+    def render(self) -> str:
+        p = self.prefix
+        out = [f"# HELP {p}_stage_seconds Time spent per app stage.", f"# TYPE {p}_stage_seconds histogram"]
+        with self._lock:
+            for stage, h in sorted(self._hists.items()):
+                cum = 0
+                for le, n in zip([*map(str, h.buckets), "+Inf"], h.counts):
+                    cum += n
+                    out.append(f'{p}_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cum}')
+                out.append(f'{p}_stage_seconds_sum{{stage="{stage}"}} {h.sum:.6f}')
+                out.append(f'{p}_stage_seconds_count{{stage="{stage}"}} {h.count}')
+        for name, fn in sorted(self._sources.items()):
+            try:
+                values = fn()
+            except Exception:
+                continue
+            for metric, v in values.items():
+                full = f"{p}_{name}_{metric}"
+                out.append(f"# TYPE {full} {'counter' if metric.endswith('_total') else 'gauge'}")
+                out.append(f"{full} {float(v):g}")
+        return "\n".join(out) + "\n"
+
+    def write(self, path: Path, min_interval_s: float = 0.0) -> bool:
+        """Atomically (re)write the export file, at most once per `min_interval_s`."""
+        now = time.monotonic()
+        if now - self._written_at < min_interval_s:
+            return False
+        self._written_at = now
+        path = Path(path)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+        tmp.write_text(self.render(), encoding="utf-8")
+        os.replace(tmp, path)
+        return True
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """Serve GET /metrics on a daemon thread."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # ~30 ms; only when an endpoint is wanted
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404); return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+        return server
+
+METRICS = Metrics()
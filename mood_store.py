@@ -0,0 +1,152 @@
+"""Mood-log storage: SQLite in WAL mode, one row per WHO-5 check-in.
+
+Appends are a single INSERT (no read-modify-write), and WAL lets several
+sessions write and read at once. The old data/mood_log.csv is imported once.
+Rows are partitioned by an anonymous per-browser user id: every query goes
+through the (user_id, ts) index or the per-user daily rollup, so a chart
+reads only that user's few recent rows however many users share the file.
+Rows from before per-user ids (LEGACY_USER, incl. the CSV import) mix
+everyone's check-ins, so no browser id ever sees them: they show only in
+single-user mode (MANNMITRA_SINGLE_USER=1) and in the all-users export.
+Days are UTC calendar dates, as the CSV-era chart computed them.
+
+Export one user's or everyone's history to Parquet for offline analysis:
+
+    python mood_store.py data/mood.sqlite mood.parquet [--user ID]
+"""
+import argparse, csv, sqlite3, time
+import datetime as dt
+from contextlib import closing
+from pathlib import Path
+
+LEGACY_USER = ""  # rows from before per-user ids (CSV import, old databases)
+
+class MoodStore:
+    def __init__(self, db_path: Path, legacy_csv: Path | None = None):
+        self.db_path = Path(db_path)
+        with closing(self._connect()) as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("BEGIN IMMEDIATE")  # several processes may open a fresh or old-format file at once
+            con.execute("CREATE TABLE IF NOT EXISTS mood (id INTEGER PRIMARY KEY, user_id TEXT NOT NULL DEFAULT '', "
+                        "ts INTEGER NOT NULL, score INTEGER NOT NULL, note TEXT)")
+            if "user_id" not in [r[1] for r in con.execute("PRAGMA table_info(mood)")]:
+                con.execute("ALTER TABLE mood ADD COLUMN user_id TEXT NOT NULL DEFAULT ''")
+            con.execute("DROP INDEX IF EXISTS mood_ts")
+            con.execute("CREATE INDEX IF NOT EXISTS mood_user_ts ON mood (user_id, ts)")
+            con.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT)")
+            if con.execute("SELECT 1 FROM meta WHERE k='daily_v' AND v='2'").fetchone() is None:
+                # (re)build the per-user rollup from the log, e.g. for files written before it existed
+                con.execute("DROP TABLE IF EXISTS mood_daily")
+                con.execute("CREATE TABLE mood_daily (user_id TEXT NOT NULL, day TEXT NOT NULL, total INTEGER NOT NULL, "
+                            "n INTEGER NOT NULL, PRIMARY KEY (user_id, day)) WITHOUT ROWID")
+                con.execute("INSERT INTO mood_daily SELECT user_id, date(ts,'unixepoch'), SUM(score), COUNT(*) FROM mood GROUP BY 1, 2")
+                con.execute("DELETE FROM meta WHERE k='daily_built'")
+                con.execute("INSERT OR REPLACE INTO meta VALUES ('daily_v', '2')")
+            con.commit()
+        if legacy_csv is not None:
+            self._migrate_csv(Path(legacy_csv))
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(str(self.db_path), timeout=10)
+        con.execute("PRAGMA synchronous=NORMAL")
+        return con
+
+    def _migrate_csv(self, path: Path):
+        """Import the pre-SQLite CSV once, then rename it so it is never read again."""
+        try:
+            with open(path, newline="", encoding="utf-8") as f:
+                rows = [(LEGACY_USER, int(float(r["ts"])), int(float(r["score"])), r.get("note") or "")
+                        for r in csv.DictReader(f) if r.get("ts") and r.get("score")]
+        except FileNotFoundError:  # absent, or another process migrated and renamed it first
+            return
+        with closing(self._connect()) as con:
+            con.execute("BEGIN IMMEDIATE")  # another process may be migrating the same file
+            if con.execute("SELECT 1 FROM meta WHERE k='csv_migrated'").fetchone() is None:
+                self._insert(con, rows)
+                con.execute("INSERT INTO meta VALUES ('csv_migrated', ?)", (str(path),))
+            con.commit()
+        try:
+            path.rename(path.with_name(path.name + ".migrated"))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _insert(con: sqlite3.Connection, rows: list[tuple[str, int, int, str]]):
+        """Append (user_id, ts, score, note) check-ins and fold them into the daily rollup, in the caller's transaction."""
+        con.executemany("INSERT INTO mood (user_id, ts, score, note) VALUES (?,?,?,?)", rows)
+        con.executemany("INSERT INTO mood_daily VALUES (?, date(?,'unixepoch'), ?, 1) "
+                        "ON CONFLICT(user_id, day) DO UPDATE SET total = total + excluded.total, n = n + 1",
+                        [(uid, ts, score) for uid, ts, score, _ in rows])
+
+    def add(self, score: int, note: str = "", ts: int | None = None, user_id: str = LEGACY_USER) -> int:
+        ts = int(time.time()) if ts is None else int(ts)
+        with closing(self._connect()) as con, con:
+            self._insert(con, [(user_id, ts, int(score), note or "")])
+        return ts
+
+    def add_many(self, rows: list[tuple[str, int, int, str]]):
+        """Bulk-append (user_id, ts, score, note) rows in one transaction."""
+        with closing(self._connect()) as con, con:
+            self._insert(con, rows)
+
+    def daily(self, days: int = 14, user_id: str = LEGACY_USER) -> list[tuple[dt.date, float]]:
+        """Mean score for the user's most recent `days` days that have check-ins, oldest first."""
+        with closing(self._connect()) as con:
+            rows = con.execute("SELECT day, CAST(total AS REAL) / n FROM mood_daily WHERE user_id = ? "
+                               "ORDER BY day DESC LIMIT ?", (user_id, days)).fetchall()
+        return [(dt.date.fromisoformat(d), mean) for d, mean in reversed(rows)]
+
+    def daily_between(self, start: dt.date, end: dt.date, user_id: str = LEGACY_USER) -> list[tuple[dt.date, float]]:
+        """Mean score per day with check-ins in [start, end], oldest first."""
+        with closing(self._connect()) as con:
+            rows = con.execute("SELECT day, CAST(total AS REAL) / n FROM mood_daily WHERE user_id = ? AND day BETWEEN ? AND ? "
+                               "ORDER BY day", (user_id, start.isoformat(), end.isoformat())).fetchall()
+        return [(dt.date.fromisoformat(d), mean) for d, mean in rows]
+
+    def rows(self, user_id: str | None = None, since_ts: int = 0, until_ts: int | None = None) -> list[tuple[int, int, str]]:
+        """(ts, score, note) oldest first; one user's rows come straight off the (user_id, ts) index."""
+        until_ts = 2**62 if until_ts is None else until_ts
+        with closing(self._connect()) as con:
+            if user_id is None:
+                return con.execute("SELECT ts, score, note FROM mood WHERE ts BETWEEN ? AND ? ORDER BY ts",
+                                   (since_ts, until_ts)).fetchall()
+            return con.execute("SELECT ts, score, note FROM mood WHERE user_id = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+                               (user_id, since_ts, until_ts)).fetchall()
+
+    def count(self, user_id: str | None = None) -> int:
+        with closing(self._connect()) as con:
+            if user_id is None:
+                return con.execute("SELECT COUNT(*) FROM mood").fetchone()[0]
+            return con.execute("SELECT COUNT(*) FROM mood WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    def export_parquet(self, dest, user_id: str | None = None, batch_rows: int = 100_000) -> int:
+        """Write check-ins (one user's or all) to a Parquet file or file-like object, in bounded batches."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = pa.schema([("user_id", pa.dictionary(pa.int32(), pa.string())), ("ts", pa.timestamp("s", tz="UTC")),
+                            ("score", pa.int16()), ("note", pa.string())])
+        sql, args = "SELECT user_id, ts, score, note FROM mood", ()
+        if user_id is not None:
+            sql, args = sql + " WHERE user_id = ?", (user_id,)
+        n = 0
+        with closing(self._connect()) as con, pq.ParquetWriter(dest, schema) as w:
+            cur = con.execute(sql + " ORDER BY user_id, ts", args)
+            while batch := cur.fetchmany(batch_rows):
+                cols = list(zip(*batch))
+                w.write_batch(pa.record_batch([pa.array(cols[0], pa.string()).dictionary_encode(),
+                                               pa.array(cols[1], pa.timestamp("s", tz="UTC")),
+                                               pa.array(cols[2], pa.int16()), pa.array(cols[3], pa.string())], schema=schema))
+                n += len(batch)
+        return n
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Export the mood log to Parquet")
+    ap.add_argument("db", help="path to mood.sqlite")
+    ap.add_argument("out", help="output .parquet file")
+    ap.add_argument("--user", help="only this user id (default: everyone)")
+    a = ap.parse_args(argv)
+    n = MoodStore(a.db).export_parquet(a.out, a.user)
+    print(f"{n} check-ins -> {a.out}")
+
+if __name__ == "__main__":
+    main()
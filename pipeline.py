@@ -0,0 +1,117 @@
+"""Concurrent chat turn: the risk check and the reply call run side by side."""
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+
+# one pool per process; Streamlit re-executes app.py but imports this module once
+_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="mannmitra-turn")
+
+@dataclass
+class TurnResult:
+    risk: int
+    reply: str
+    risk_s: float = 0.0      # time spent on the risk check (or until it was abandoned)
+    reply_s: float = 0.0     # time spent on the reply call (0 when suppressed)
+    wall_s: float = 0.0      # end-to-end time the user waited
+    timed_out: list = field(default_factory=list)
+    suppressed: bool = False # reply replaced by the crisis message
+    ttft_s: float | None = None  # streaming mode: time until the first reply chunk was shown
+
+    @property
+    def saved_s(self) -> float:
+        """Time saved versus running the two calls back to back."""
+        return max(0.0, self.risk_s + self.reply_s - self.wall_s)
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+def run_turn(msg: str, *, risk_fn, reply_fn, keyword_risk_fn, fallback_reply: str,
+             crisis_reply: str, deadline_s: float = 8.0) -> TurnResult:
+    """Start the risk check and the reply together; each gets `deadline_s`.
+
+    A keyword hit at level 2+ is final, so the reply call is never started.
+    If the risk check runs out of time the keyword result is used; if the reply
+    runs out of time `fallback_reply` is used. Risk 2+ always replaces the reply.
+    """
+    t0 = time.perf_counter()
+    kw = keyword_risk_fn(msg)
+    if kw >= 2:
+        return TurnResult(risk=kw, reply=crisis_reply, wall_s=time.perf_counter() - t0, suppressed=True)
+
+    risk_f = _POOL.submit(_timed, risk_fn, msg)
+    reply_f = _POOL.submit(_timed, reply_fn, msg)
+    res = TurnResult(risk=kw, reply=fallback_reply)
+
+    try:
+        res.risk, res.risk_s = risk_f.result(timeout=deadline_s)
+    except FutureTimeout:
+        res.timed_out.append("risk"); res.risk_s = time.perf_counter() - t0
+    except Exception:
+        res.risk_s = time.perf_counter() - t0
+    res.risk = max(res.risk, kw)
+
+    if res.risk >= 2:
+        reply_f.cancel()
+        res.reply, res.suppressed = crisis_reply, True
+    else:
+        remaining = max(0.0, deadline_s - (time.perf_counter() - t0))
+        try:
+            res.reply, res.reply_s = reply_f.result(timeout=remaining)
+        except FutureTimeout:
+            res.timed_out.append("reply"); res.reply_s = time.perf_counter() - t0
+        except Exception:
+            res.reply_s = time.perf_counter() - t0
+    res.wall_s = time.perf_counter() - t0
+    return res
+
+def run_streaming_turn(msg: str, *, risk_fn, stream_fn, render, keyword_risk_fn, fallback_reply: str,
+                       crisis_reply: str, deadline_s: float = 8.0) -> TurnResult:
+    """Like `run_turn`, but the reply is streamed on the calling thread.
+
+    `stream_fn(msg)` yields text chunks and `render(chunks)` shows them as they
+    arrive and returns the full text (e.g. `st.write_stream`). The risk check
+    runs on the pool meanwhile; the stream stops early once it reports risk 2+
+    or the deadline passes, and the caller swaps in `res.reply` if `suppressed`.
+    """
+    t0 = time.perf_counter()
+    kw = keyword_risk_fn(msg)
+    if kw >= 2:
+        render(iter([crisis_reply]))
+        return TurnResult(risk=kw, reply=crisis_reply, wall_s=time.perf_counter() - t0, suppressed=True)
+
+    risk_f = _POOL.submit(_timed, risk_fn, msg)
+    res = TurnResult(risk=kw, reply=fallback_reply)
+
+    def chunks():
+        shown = False
+        for part in stream_fn(msg):
+            if risk_f.done() and not risk_f.exception() and risk_f.result()[0] >= 2:
+                return
+            if time.perf_counter() - t0 > deadline_s:
+                res.timed_out.append("reply")
+                break
+            if part:
+                if not shown:
+                    res.ttft_s, shown = time.perf_counter() - t0, True
+                yield part
+        if not shown:
+            res.ttft_s = time.perf_counter() - t0
+            yield fallback_reply
+
+    res.reply = render(chunks()) or fallback_reply
+    res.reply_s = time.perf_counter() - t0
+
+    remaining = max(0.0, deadline_s - res.reply_s)
+    try:
+        res.risk, res.risk_s = risk_f.result(timeout=remaining)
+    except FutureTimeout:
+        res.timed_out.append("risk"); res.risk_s = time.perf_counter() - t0
+    except Exception:
+        res.risk_s = time.perf_counter() - t0
+    res.risk = max(res.risk, kw)
+    if res.risk >= 2:
+        res.reply, res.suppressed = crisis_reply, True
+    res.wall_s = time.perf_counter() - t0
+    return res
@@ -0,0 +1,108 @@
+"""Local retrieval of exercises and games for free-text messages.
+
+Every item (title, when/what text, steps and EN/Hindi/Hinglish keywords) is a
+TF-IDF vector over character 3–5-grams of its words, which copes with
+spelling variants and transliterated Hinglish. The vectors form one dense
+(columns x items) float32 matrix built once; a message is scored against all
+items with one row gather and a mat-vec, no model call. n-grams are hashed
+into 8,192 columns, so the matrix costs 32 KB per item (about 290 KB for the
+current content, 32 MB at 1,000 items): fine for a curated list, not for a
+catalogue.
+
+n-gram similarity alone also rewards small talk ("hello how are you" shares
+"ell"/"ow " with plenty of steps), so items can carry anchors: keyword
+phrases one of which must appear in the message, word by word, allowing a
+plural/-ed/-ing ending or one typo in longer words.
+"""
+import math, re, zlib
+from collections import Counter
+
+import numpy as np
+
+from riddles import NearIndex
+
+_WORD = re.compile(r"[\w\u0900-\u097F]+")  # \w alone misses Devanagari vowel signs
+_SUFFIXES = ("ing", "ed", "es", "s", "d")
+
+def _words(text: str) -> list[str]:
+    return _WORD.findall(text.lower().replace("’", "").replace("'", ""))
+
+def _ngrams(text: str, lo: int = 3, hi: int = 5) -> list[str]:
+    out = []
+    for w in _words(text):
+        w = f" {w} "
+        for n in range(lo, hi + 1):
+            out += [w[i:i + n] for i in range(len(w) - n + 1)]
+    return out
+
+def _forms(word: str) -> set[str]:
+    """`word` and the word with one common ending removed ("fighting" -> "fight")."""
+    return {word, *(word[:-len(s)] for s in _SUFFIXES if word.endswith(s) and len(word) - len(s) >= 3)}
+
+def item_text(item: dict, keywords: list[str] = ()) -> str:
+    steps = item.get("steps", [])
+    return " ".join([item.get("title", ""), item.get("when", ""), item.get("what", ""),
+                     *(s for s in steps if isinstance(s, str)), *keywords])
+
+class SuggestionIndex:
+    def __init__(self, items: list[dict], texts: list[str], anchors: list[list[str]] | None = None, dims: int = 1 << 13):
+        """`items[i]` is returned (with a score) when `texts[i]` matches best and, if `anchors`
+        is given, one of the phrases in `anchors[i]` occurs in the message."""
+        self.items, self.dims = items, dims
+        docs = [Counter(_ngrams(t)) for t in texts]
+        self._col: dict[str, int] = {}  # known n-gram -> column; unknown query n-grams are dropped
+        for d in docs:
+            for g in d:
+                if g not in self._col: self._col[g] = zlib.crc32(g.encode()) % dims
+        df = np.zeros(dims, dtype=np.float32)
+        for d in docs:
+            df[np.unique([self._col[g] for g in d])] += 1
+        self._idf = np.log((1 + len(docs)) / (1 + df)).astype(np.float32)  # 0 for n-grams every item has
+        self._m = np.zeros((dims, len(docs)), dtype=np.float32)
+        for j, d in enumerate(docs):
+            for g, tf in d.items():
+                self._m[self._col[g], j] += 1 + math.log(tf)
+        self._m *= self._idf[:, None]
+        self._m /= np.maximum(np.linalg.norm(self._m, axis=0), 1e-9)
+        self._anchors = None
+        if anchors is not None:
+            self._anchors = [[frozenset(_words(p)) for p in phrases if _words(p)] for phrases in anchors]
+            self._forms: dict[str, set[str]] = {}  # form of an anchor word -> anchor words
+            self._near = NearIndex()  # anchor words long enough to allow a typo
+            for w in {w for phrases in self._anchors for p in phrases for w in p}:
+                for f in _forms(w): self._forms.setdefault(f, set()).add(w)
+                if len(w) >= 5: self._near.add(w)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def scores(self, text: str) -> np.ndarray:
+        """Cosine similarity of `text` to every item."""
+        col = self._col
+        hit = [col[g] for g in _ngrams(text) if g in col]
+        if not hit:
+            return np.zeros(len(self.items), dtype=np.float32)
+        cols, tf = np.unique(np.array(hit, dtype=np.intp), return_counts=True)
+        w = (1 + np.log(tf, dtype=np.float32)) * self._idf[cols]
+        return (w @ self._m[cols]) / max(float(np.linalg.norm(w)), 1e-9)
+
+    def _anchor_words(self, text: str) -> set[str]:
+        """Anchor words present in `text`."""
+        seen = set()
+        for w in _words(text):
+            hits = set().union(*(self._forms.get(f, ()) for f in _forms(w)))
+            if not hits and len(w) >= 5: hits = {a for _, a in self._near.search(w)}
+            seen |= hits
+        return seen
+
+    def search(self, text: str, k: int = 3, min_score: float = 0.0) -> list[dict]:
+        s = self.scores(text)
+        top = np.argsort(-s)
+        top = top[s[top] > min_score]
+        if self._anchors is not None and len(top):
+            seen = self._anchor_words(text)
+            top = [i for i in top if any(p <= seen for p in self._anchors[i])]
+        return [{**self.items[i], "score": float(s[i])} for i in top[:k]]
+
+    def nbytes(self) -> int:
+        return self._m.nbytes + self._idf.nbytes
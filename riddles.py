@@ -0,0 +1,115 @@
+"""Riddle bank: answers normalised once, exact hits and near-misses by hash lookup.
+
+Every accepted answer is normalised when the bank is built (case, punctuation,
+spacing, a leading "a/an/the") into a dict, so an exact answer is one lookup
+however many riddles ship. Typos ("clok") are accepted within a small edit
+distance that grows with the answer's length, unless some other riddle's
+answer is even closer. Tolerances top out at 2, so "anything closer?" only
+ever asks for answers within distance 1, which a per-language index of
+one-character deletions answers with a few hash lookups (a BK-tree needed
+tens of milliseconds at 10,000 riddles and grew with the bank). Quizzes
+sample riddle indices and hand out references, never copying the bank.
+"""
+import random, re, unicodedata
+
+_NON_WORD = re.compile(r"[^\w\u0900-\u097F]+")  # \w alone misses Devanagari vowel signs
+_ARTICLES = ("a ", "an ", "the ")
+
+def norm_answer(s: str) -> str:
+    s = unicodedata.normalize("NFKC", s).lower().replace("’", "").replace("'", "")
+    s = _NON_WORD.sub(" ", s).replace("_", " ").strip()
+    s = " ".join(s.split())
+    for a in _ARTICLES:
+        if s.startswith(a): return s[len(a):]
+    return s
+
+def levenshtein(a: str, b: str) -> int:
+    if len(a) < len(b): a, b = b, a
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+def tolerance(answer: str) -> int:
+    """Typos allowed for a normalised answer: none for very short words."""
+    n = len(answer)
+    return 0 if n < 4 else 1 if n < 6 else 2
+
+def _deletes(word: str) -> set[str]:
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+class NearIndex:
+    """Strings within edit distance 1 of a query, by hash lookups only.
+
+    Each stored word is filed under itself and its one-character deletions. Two
+    strings at distance <= 1 always share such a key (insertions and deletions
+    hit the word itself, substitutions a common deletion), so a query looks up
+    its own keys and verifies the few candidates: cost depends on the query's
+    length, not on how many words are stored.
+    """
+
+    def __init__(self):
+        self._keys: dict[str, set[str]] = {}
+        self.size = 0
+
+    def add(self, word: str):
+        if word in self._keys.get(word, ()): return
+        self.size += 1
+        for k in (word, *_deletes(word)):
+            self._keys.setdefault(k, set()).add(word)
+
+    def search(self, word: str, radius: int = 1) -> list[tuple[int, str]]:
+        """(distance, word) for every stored word within `radius` (0 or 1)."""
+        if radius > 1: raise ValueError("NearIndex only covers distance 1")
+        if radius <= 0:
+            return [(0, word)] if word in self._keys.get(word, ()) else []
+        seen = set().union(*(self._keys.get(k, ()) for k in (word, *_deletes(word))))
+        return [(d, w) for w in seen if (d := levenshtein(word, w)) <= radius]
+
+class RiddleBank:
+    def __init__(self, riddles: list[dict]):
+        """`riddles`: {"q", "answers", "hint", "lang"} dicts; lang is a UI language, default English."""
+        self.riddles: list[dict] = []
+        self._by_lang: dict[str, list[int]] = {}
+        self._exact: dict[str, dict[str, set[int]]] = {}  # lang -> normalised answer -> riddle ids
+        self._near: dict[str, NearIndex] = {}
+        for i, r in enumerate(riddles):
+            lang = r.get("lang", "English")
+            keys = tuple(dict.fromkeys(k for k in map(norm_answer, r["answers"]) if k))
+            self.riddles.append({"id": i, "q": r["q"], "hint": r.get("hint", ""), "answers": r["answers"],
+                                 "lang": lang, "keys": keys})
+            self._by_lang.setdefault(lang, []).append(i)
+            exact, near = self._exact.setdefault(lang, {}), self._near.setdefault(lang, NearIndex())
+            for k in keys:
+                exact.setdefault(k, set()).add(i)
+                near.add(k)
+
+    def __len__(self) -> int:
+        return len(self.riddles)
+
+    def languages(self) -> dict[str, int]:
+        return {lang: len(ids) for lang, ids in self._by_lang.items()}
+
+    def sample(self, k: int, lang: str = "English", rng: random.Random | None = None) -> list[dict]:
+        """`k` distinct riddles in `lang` (English if it has fewer than `k`)."""
+        ids = self._by_lang.get(lang, [])
+        if len(ids) < k: ids = self._by_lang.get("English", ids)
+        picks = (rng or random).sample(range(len(ids)), min(k, len(ids)))  # a range, not a copy of the pool
+        return [self.riddles[ids[j]] for j in picks]
+
+    def check(self, riddle: dict, text: str) -> str | None:
+        """Returns "exact", "close" (an accepted typo) or None."""
+        n = norm_answer(text)
+        keys = riddle.get("keys") or tuple(map(norm_answer, riddle["answers"]))  # pools drawn before a reload keep working
+        if not n or not keys: return None
+        if n in keys: return "exact"
+        d, key = min((levenshtein(n, k), k) for k in keys)
+        if d > tolerance(key): return None
+        lang = riddle.get("lang", "English")
+        if n in self._exact.get(lang, {}): return None  # another riddle's answer, spelled right
+        near = self._near.get(lang)
+        if d > 1 and near and near.search(n, d - 1): return None  # closer to another answer
+        return "close"
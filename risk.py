@@ -0,0 +1,97 @@
+"""Risk classification and suggestion rules, free of any UI dependency.
+
+app.py wraps these with its process-wide matcher, Gemini gateway and cache;
+triage.py uses them directly for offline re-scoring.
+"""
+import json
+
+from matcher import CueMatcher
+
+RISK_CUES = {
+    "urgent": ["suicide","kill myself","end my life","jump off","hang myself","आत्महत्या","hurt myself badly"],
+    "high":   ["self harm","cut myself","can't go on","no reason to live","severe pain"],
+    "low":    ["very sad","depressed","lonely","crying","hopeless","numb","empty"],
+}
+
+SUGGESTION_RULES = [
+    # cue syntax: see matcher.py (\b marks a word boundary, otherwise substring)
+    {"id":"breathing_478","type":"exercise","title":"Try 4-7-8 breathing",
+     "match_any":[r"\banxious\b", r"\banxiety\b", r"\bstress\b", r"\bstressed\b", r"\boverwhelm", r"घबराहट", r"tension"]},
+    {"id":"grounding_54321","type":"exercise","title":"Try 5-4-3-2-1 grounding",
+     "match_any":[r"\boverthink", r"\bspiral", r"\bloop", r"\bracing thoughts\b"]},
+    {"id":"stroop","type":"game","title":"Play a 1-minute Focus game",
+     "match_any":[r"\bbored\b", r"\bdistract", r"\bcan't focus\b", r"\bcant focus\b", r"\bcan t focus\b", r"\bprocrastinat"]},
+]
+
+RETRIEVAL_MIN_SCORE = 0.12  # below this, unrelated messages still share a few n-grams with every item
+
+RISK_PROMPT = "Classify self-harm risk: return only JSON {\"risk\":0|1|2|3}. Message: "
+RISK_BATCH_PROMPT = ("Classify self-harm risk for each message in this JSON array, independently: return only JSON "
+                     "{\"risks\":[0|1|2|3, ...]} with one entry per message, in order. Messages: ")
+
+def build_matcher(extra: dict) -> CueMatcher:
+    """Built-in cues plus extra phrasings from content/cues.json."""
+    cues = {cat: list(items) + extra.get(cat, []) for cat, items in RISK_CUES.items()}
+    for r in SUGGESTION_RULES:
+        cues[f"suggest:{r['id']}"] = list(r["match_any"]) + extra.get(f"suggest:{r['id']}", [])
+    return CueMatcher(cues)
+
+def risk_from_hits(hits: dict) -> int:
+    if "urgent" in hits: return 3
+    if "high" in hits:   return 2
+    if "low" in hits:    return 1
+    return 0
+
+def keyword_risk(text: str, matcher: CueMatcher) -> int:
+    """Keyword-only risk (no model call); also the fallback when the model is slow."""
+    return risk_from_hits(matcher.scan(text))
+
+def parse_risk(raw: str) -> int:
+    return int(json.loads((raw or "{}").strip()).get("risk", 0))
+
+def batch_contents(texts: list[str]) -> list[dict]:
+    return [{"role":"user","parts":[{"text": RISK_BATCH_PROMPT + json.dumps(texts, ensure_ascii=False)}]}]
+
+def parse_risks(raw: str, n: int) -> list[int]:
+    """Risks from a batch answer; raises ValueError unless there is exactly one per message."""
+    v = json.loads((raw or "{}").strip())
+    risks = v.get("risks") if isinstance(v, dict) else v
+    if not isinstance(risks, list) or len(risks) != n:
+        raise ValueError(f"expected {n} risks, got {raw!r:.80}")
+    return [min(3, max(0, int(r))) for r in risks]
+
+def classify_risk(text: str, matcher: CueMatcher, llm=None, cache=None, scheduler=None) -> int:
+    """Keyword risk, refined by the model when `llm` (a GeminiGateway) is enabled.
+
+    Cached model results are stored and read back floored at the keyword risk.
+    With a `scheduler` (a RiskScheduler) the model call is shared with identical
+    messages and batched with others; if it refuses (quota spent) or fails, the
+    keyword risk stands.
+    """
+    kw = keyword_risk(text, matcher)
+    if kw >= 2: return kw
+    if llm is not None and llm.enabled:
+        cached = cache.get("risk", "", text) if cache is not None else None
+        if cached is not None:
+            return max(int(cached), kw)  # keyword lists may have grown since this was cached
+        try:
+            risk = (scheduler.classify(text) if scheduler is not None else
+                    parse_risk(llm.generate([{"role":"user","parts":[{"text": RISK_PROMPT + text}]}])))
+            risk = max(risk, kw)  # same floor as the cached path, so a repeat scores the same
+            if cache is not None: cache.put("risk", "", text, risk)
+            return risk
+        except Exception:
+            pass
+    return kw
+
+def choose_suggestion(user_text: str, matcher: CueMatcher, index=None):
+    """Rule cues first, then the closest exercise/game from `index` (a SuggestionIndex)."""
+    hits = matcher.scan(user_text)
+    for r in SUGGESTION_RULES:
+        if f"suggest:{r['id']}" in hits: return {"source":"rules", **r}
+    if index is not None:
+        best = index.search(user_text, k=1, min_score=RETRIEVAL_MIN_SCORE)
+        if best: return {"source":"retrieval", **best[0]}
+    if len(user_text.split()) >= 25:
+        return {"source":"rules","id":"breathing_478","type":"exercise","title":"Try 4-7-8 breathing"}
+    return None
@@ -0,0 +1,152 @@
+"""Process-wide scheduler for model risk checks: single-flight, micro-batches, quota.
+
+When a whole class chats at once, many near-identical messages arrive within
+seconds. Instead of one Gemini call per message:
+
+- identical messages (after llm_cache.normalize) already queued or being
+  classified share that one result;
+- distinct messages arriving within `window_s` of the first queued one go out
+  together (up to `max_batch`) as one multi-message prompt, parsed back per
+  message;
+- a batch is only formed once a worker is free, so while all workers are
+  busy the queue grows and goes out as `max_batch`-sized batches;
+- messages whose callers have all stopped waiting (`wait_s`) are dropped
+  from the queue instead of being sent;
+- every call takes a token from a token bucket; when the quota is spent the
+  batch is refused with `RateLimited` and callers keep the keyword risk.
+
+`stats()` exposes queue depth and batch sizes (also exported as the "risk"
+metrics source by the engine).
+"""
+import threading, time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from gemini import LLMUnavailable
+from llm_cache import normalize
+from metrics import METRICS
+from risk import RISK_PROMPT, batch_contents, parse_risk, parse_risks
+
+class RateLimited(LLMUnavailable):
+    pass
+
+class TokenBucket:
+    """`rate_per_s` tokens a second, holding at most `burst`; `take` never blocks."""
+
+    def __init__(self, rate_per_s: float, burst: float):
+        self.rate, self.burst = rate_per_s, burst
+        self.tokens, self._t = float(burst), time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, n: float = 1.0) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self._t) * self.rate)
+            self._t = now
+            if self.tokens < n: return False
+            self.tokens -= n
+            return True
+
+class RiskScheduler:
+    def __init__(self, llm, *, window_s: float = 0.05, max_batch: int = 16, bucket: TokenBucket | None = None,
+                 max_concurrency: int = 4, wait_s: float | None = None):
+        self.llm, self.window_s, self.max_batch, self.bucket = llm, window_s, max(1, max_batch), bucket
+        self.wait_s = wait_s if wait_s is not None else llm.deadline_s + window_s
+        self._queue: list[tuple[str, str, Future, float]] = []  # (key, text, future, queued_at), oldest first
+        self._inflight: dict[str, Future] = {}  # key -> future, from queueing until the result is set
+        self._wanted: dict[str, float] = {}  # key -> when its last waiting caller gives up
+        self._free = threading.Semaphore(max_concurrency)  # idle workers
+        self._cv = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="risk-batch")
+        self._thread = None  # dispatcher, started on first use
+        self.submitted = self.coalesced = self.batches = self.batched = self.rate_limited = self.failed = self.abandoned = 0
+        self.last_batch = 0
+
+    def submit(self, text: str) -> Future:
+        """Future of the model risk (0-3) for `text`, shared with identical messages in flight."""
+        key = normalize(text)
+        with self._cv:
+            self.submitted += 1
+            self._wanted[key] = time.monotonic() + self.wait_s
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.coalesced += 1
+                return fut
+            fut = self._inflight[key] = Future()
+            self._queue.append((key, text, fut, time.monotonic()))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch, daemon=True, name="risk-scheduler")
+                self._thread.start()
+            self._cv.notify()
+        return fut
+
+    def classify(self, text: str) -> int:
+        """Blocking `submit`; raises LLMUnavailable (incl. RateLimited), ValueError or TimeoutError."""
+        return self.submit(text).result(timeout=self.wait_s)
+
+    def _dispatch(self):
+        while True:
+            self._free.acquire()  # a batch is formed only when a worker can take it
+            with self._cv:
+                while not self._queue:
+                    self._cv.wait()
+                close_at = self._queue[0][3] + self.window_s
+                while len(self._queue) < self.max_batch and (left := close_at - time.monotonic()) > 0:
+                    self._cv.wait(left)
+                now = time.monotonic()
+                gone = [e for e in self._queue if self._wanted.get(e[0], 0) <= now]
+                if gone: self._queue = [e for e in self._queue if self._wanted.get(e[0], 0) > now]
+                batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+            if gone:
+                self._finish(gone, error=LLMUnavailable("risk check abandoned by its callers"), count="abandoned")
+            for *_, queued_at in batch:
+                METRICS.observe("risk.queue_wait", now - queued_at)
+            if not batch:
+                self._free.release()
+                continue
+            if self.bucket is not None and not self.bucket.take():
+                self._free.release()
+                self._finish(batch, error=RateLimited("risk-check quota spent"), count="rate_limited")
+                continue
+            try:
+                self._pool.submit(self._call, batch)
+            except RuntimeError as e:  # pool shut down (interpreter exit): fail the batch, keep serving
+                self._free.release()
+                self._finish(batch, error=LLMUnavailable(f"risk-check pool closed: {e}"), count="failed")
+
+    def _call(self, batch: list):
+        texts = [text for _, text, _, _ in batch]
+        with self._cv:
+            self.batches += 1
+            self.batched += len(texts)
+            self.last_batch = len(texts)
+        try:
+            with METRICS.time("risk.batch"):
+                if len(texts) == 1:
+                    risks = [parse_risk(self.llm.generate([{"role":"user","parts":[{"text": RISK_PROMPT + texts[0]}]}]))]
+                else:
+                    risks = parse_risks(self.llm.generate(batch_contents(texts)), len(texts))
+        except Exception as e:
+            self._finish(batch, error=e, count="failed")
+            return
+        finally:
+            self._free.release()
+        self._finish(batch, risks)
+
+    def _finish(self, batch: list, risks: list[int] | None = None, error: Exception | None = None,
+                count: str | None = None):
+        """Resolves the batch's futures; `count` names the counter its size is added to."""
+        with self._cv:
+            if count: setattr(self, count, getattr(self, count) + len(batch))
+            for key, *_ in batch:
+                self._inflight.pop(key, None)
+                self._wanted.pop(key, None)
+        for i, (_, _, fut, _) in enumerate(batch):
+            if error is not None: fut.set_exception(error)
+            else: fut.set_result(risks[i])
+
+    def stats(self) -> dict:
+        with self._cv:  # one consistent snapshot
+            return {"queue_depth": len(self._queue), "inflight": len(self._inflight), "last_batch_size": self.last_batch,
+                    "mean_batch_size": self.batched / self.batches if self.batches else 0.0,
+                    "submitted": self.submitted, "coalesced": self.coalesced, "batches": self.batches,
+                    "rate_limited": self.rate_limited, "failed": self.failed, "abandoned": self.abandoned}
@@ -0,0 +1,85 @@
+import threading, time
+from types import SimpleNamespace
+
+import pytest
+
+from gemini import CircuitBreaker, GeminiGateway, LLMUnavailable
+
+class FakeModels:
+    def __init__(self):
+        self.fail = False
+        self.hang = threading.Event()  # cleared: calls block until it is set
+        self.hang.set()
+        self.calls = self.streamed = 0
+        self.delay = 0.0  # between stream chunks
+
+    def generate_content(self, model, contents):
+        self.calls += 1
+        self.hang.wait()
+        return SimpleNamespace(text="ok")
+
+    def generate_content_stream(self, model, contents):
+        if self.fail: raise RuntimeError("upstream down")
+        for text in ("one ", "two ", "three"):
+            self.streamed += 1
+            yield SimpleNamespace(text=text)
+            time.sleep(self.delay)
+
+def gateway(**kw):
+    gw = GeminiGateway(None, breaker=CircuitBreaker(fail_threshold=1, reset_after_s=0.05), **kw)
+    gw._client, gw._available = SimpleNamespace(models=FakeModels()), True
+    return gw
+
+def open_then_half_open(gw):
+    gw.client.models.fail = True
+    with pytest.raises(LLMUnavailable):
+        list(gw.stream("hi"))
+    assert gw.breaker.state == "open"
+    gw.client.models.fail = False
+    time.sleep(0.06)
+    assert gw.breaker.state == "half-open"
+
+def test_stream_closed_early_during_half_open_trial_frees_the_trial():
+    gw = gateway()
+    open_then_half_open(gw)
+    s = gw.stream("hi")
+    assert next(s) == "one "
+    s.close()
+    assert gw.breaker.allow() and gw.breaker.state == "half-open"  # a new trial is let through
+
+def test_stream_read_to_the_end_closes_the_breaker():
+    gw = gateway()
+    open_then_half_open(gw)
+    assert "".join(gw.stream("hi")) == "one two three"
+    assert gw.breaker.state == "closed"
+
+def test_hung_calls_keep_their_slots_and_later_calls_are_refused_not_queued():
+    gw = gateway(max_concurrency=2, deadline_s=0.05)
+    gw.breaker.fail_threshold = 99
+    models = gw.client.models
+    models.hang.clear()
+    try:
+        for _ in range(2):
+            with pytest.raises(LLMUnavailable):
+                gw.generate("hi")  # times out, upstream still running
+        t0 = time.monotonic()
+        for _ in range(4):
+            with pytest.raises(LLMUnavailable, match="slots busy"):
+                gw.generate("hi")
+        assert time.monotonic() - t0 < 0.05 and models.calls == 2  # refused at once, never sent upstream
+    finally:
+        models.hang.set()  # the hung calls finally return and give their slots back
+    deadline = time.monotonic() + 1
+    while gw._slots._value < 2 and time.monotonic() < deadline: time.sleep(0.01)
+    assert gw.generate("hi") == "ok" and gw.breaker.state == "closed"
+
+def test_abandoned_stream_stops_reading_upstream_and_frees_its_slot():
+    gw = gateway(max_concurrency=1)
+    gw.client.models.delay = 0.05
+    s = gw.stream("hi")
+    assert next(s) == "one "
+    s.close()
+    time.sleep(0.2)
+    assert gw.client.models.streamed == 2 and gw._slots._value == 1  # stopped at the next chunk
+    gw.client.models.delay = 0.0
+    assert "".join(gw.stream("hi")) == "one two three"
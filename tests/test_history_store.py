@@ -0,0 +1,23 @@
+from history_store import ChatHistory, sweep
+
+def filled(tmp_path, n=10):
+    h = ChatHistory(tmp_path / "s.jsonl", ring_size=3)
+    for i in range(n): h.append("user", f"m{i}")
+    return h
+
+def test_pages_span_disk_and_ring(tmp_path):
+    h = filled(tmp_path)
+    assert [t for _, t in h.page(0, 10)] == [f"m{i}" for i in range(10)]
+    assert h.last_user(4) == ["m6", "m7", "m8", "m9"]
+
+def test_swept_file_reads_as_expired_turns(tmp_path):
+    h = filled(tmp_path)
+    sweep(tmp_path, max_age_s=-1)  # an idle tab's file taken by the sweeper
+    assert [t for _, t in h.page(0, 10)] == ["m7", "m8", "m9"]
+    assert len(h) == 3 and h.last_user(5) == ["m7", "m8", "m9"]
+
+def test_spill_after_sweep_starts_a_fresh_file(tmp_path):
+    h = filled(tmp_path)
+    sweep(tmp_path, max_age_s=-1)
+    h.append("user", "m10")  # spills m7 into a new file; the old offsets must not point into it
+    assert [t for _, t in h.page(0, len(h))] == ["m7", "m8", "m9", "m10"]
@@ -0,0 +1,21 @@
+import datetime as dt
+
+from mood_store import LEGACY_USER, MoodStore
+
+DAY = 86400 * 20000  # 2024-10-04, UTC midnight
+
+def test_legacy_rows_stay_apart_from_user_ids(tmp_path):
+    m = MoodStore(tmp_path / "mood.sqlite")
+    m.add_many([(LEGACY_USER, DAY, 80, "old note"), (LEGACY_USER, DAY + 86400, 40, "")])
+    m.add(20, ts=DAY + 86400, user_id="a" * 32)
+    day = dt.date(2024, 10, 4)
+    assert m.daily(user_id="a" * 32) == [(day + dt.timedelta(days=1), 20.0)]
+    assert m.daily(user_id=LEGACY_USER) == [(day, 80.0), (day + dt.timedelta(days=1), 40.0)]
+    assert m.count("a" * 32) == 1 and m.count() == 3
+
+def test_csv_migrated_once_and_missing_csv_is_fine(tmp_path):
+    csv_path = tmp_path / "mood_log.csv"
+    csv_path.write_text("ts,score,note\n1728000000,60,hi\n", encoding="utf-8")
+    assert MoodStore(tmp_path / "mood.sqlite", legacy_csv=csv_path).count(LEGACY_USER) == 1
+    assert not csv_path.exists()  # renamed by the first process; a second one finds nothing to read
+    assert MoodStore(tmp_path / "mood.sqlite", legacy_csv=csv_path).count(LEGACY_USER) == 1
@@ -0,0 +1,31 @@
+import pytest
+
+import engine
+from risk import choose_suggestion
+
+CONTENT = engine.build_content()
+MATCHER, INDEX = CONTENT.get("matcher"), CONTENT.get("suggest_index")
+
+NEUTRAL = ["hello how are you", "thank you so much", "what is your name", "I got a new phone",
+           "I passed my exam!", "ok thanks", "hi", "good morning", "see you tomorrow", "tell me a joke",
+           "I had pasta for lunch", "my roommate ate my food again lol", "what's the weather like today",
+           "I watched a movie yesterday", "namaste", "kya haal hai", "theek hoon", "aaj kya kiya", "मैं ठीक हूँ", "bye"]
+
+@pytest.mark.parametrize("msg", NEUTRAL)
+def test_small_talk_gets_no_suggestion(msg):
+    assert choose_suggestion(msg, MATCHER, INDEX) is None
+
+@pytest.mark.parametrize("msg,want", [
+    ("gussa aa raha hai sab pe", "stop_skill"),
+    ("मुझे नींद नहीं आ रही", "body_scan"),
+    ("nothing good ever happens to me", "gratitude"),
+    ("can't sleep, shoulders so tense", "body_scan"),
+    ("interview tomorrow and my heart is pounding", "box_breath"),
+    ("mujhe bahut chinta ho rahi hai", "breathing_478"),
+    ("mujhe bahut chintaa ho rahi hai", "breathing_478"),  # one typo
+    ("I keep fighting with my brother", "stop_skill"),
+    ("I need a break, something fun", "riddles"),
+])
+def test_retrieval_still_finds_related_messages(msg, want):
+    s = choose_suggestion(msg, MATCHER, INDEX)
+    assert s is not None and s["source"] == "retrieval" and s["id"] == want
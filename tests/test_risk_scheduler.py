@@ -0,0 +1,68 @@
+import json, threading, time
+
+import pytest
+
+from gemini import LLMUnavailable
+from risk_scheduler import RiskScheduler
+
+class FakeLLM:
+    deadline_s = 1.0
+
+    def generate(self, contents):
+        text = contents[0]["parts"][0]["text"]
+        if text.endswith("]"):  # batch prompt: a JSON list of messages
+            return json.dumps({"risks": [0] * len(json.loads(text[text.rindex("["):]))})
+        return '{"risk": 0}'
+
+def test_closed_pool_fails_the_batch_and_keeps_dispatching():
+    sched = RiskScheduler(FakeLLM(), window_s=0.01, wait_s=2)
+    assert sched.classify("first message") == 0
+    sched._pool.shutdown()  # as at interpreter exit
+    with pytest.raises(LLMUnavailable):
+        sched.classify("second message")
+    assert sched._thread.is_alive()
+    with pytest.raises(LLMUnavailable):
+        sched.classify("third message")
+    assert sched.stats()["failed"] == 2
+
+def test_counters_add_up_under_concurrency():
+    sched = RiskScheduler(FakeLLM(), window_s=0.005, max_batch=1, max_concurrency=8, wait_s=5)
+    threads = [threading.Thread(target=lambda i=i: [sched.classify(f"message {i} {j}") for j in range(25)])
+               for i in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    s = sched.stats()
+    assert s["submitted"] == s["batches"] == 200 and s["mean_batch_size"] == 1.0
+
+class SlowLLM(FakeLLM):
+    def __init__(self):
+        self.gate, self.sizes = threading.Event(), []
+
+    def generate(self, contents):
+        self.gate.wait()
+        text = contents[0]["parts"][0]["text"]
+        self.sizes.append(len(json.loads(text[text.rindex("["):])) if text.endswith("]") else 1)
+        return super().generate(contents)
+
+def test_backlog_waits_in_the_queue_and_goes_out_in_full_batches():
+    llm = SlowLLM()
+    sched = RiskScheduler(llm, window_s=0.005, max_batch=4, max_concurrency=1, wait_s=5)
+    first = sched.submit("message 0")
+    time.sleep(0.05)  # the one worker is now busy with it
+    futs = [sched.submit(f"message {i}") for i in range(1, 11)]
+    time.sleep(0.05)
+    assert sched.stats()["queue_depth"] == 10
+    llm.gate.set()
+    assert first.result(2) == 0 and [f.result(2) for f in futs] == [0] * 10
+    assert llm.sizes == [1, 4, 4, 2]
+
+def test_messages_nobody_waits_for_are_not_sent():
+    llm = SlowLLM()
+    sched = RiskScheduler(llm, window_s=0.005, max_concurrency=1, wait_s=0.05)
+    with pytest.raises(TimeoutError):
+        sched.classify("message 0")  # blocks the only worker
+    with pytest.raises(TimeoutError):
+        sched.classify("message 1")  # queued behind it; its caller gives up too
+    llm.gate.set()
+    time.sleep(0.1)
+    assert llm.sizes == [1] and sched.stats()["abandoned"] == 1
@@ -0,0 +1,90 @@
+"""Offline risk triage: re-score a JSONL file of messages with the app's rules.
+
+    python triage.py messages.jsonl -o scored.jsonl             # keywords only, process pool
+    python triage.py messages.jsonl --llm --concurrency 4       # + Gemini (GEMINI_API_KEY)
+
+Each input line is a JSON object with a text field (``--field``, default
+"text"); other keys are passed through. Each output line adds ``risk``,
+``cues`` (matched cues per category) and ``suggestion`` (exercise/game id or null).
+Lines are read and written in windows, so memory stays flat on large files.
+Throughput goes to stderr. Streamlit is never imported.
+"""
+import argparse, itertools, json, os, sys, time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import risk
+from content import load_json_safe
+from engine import build_content
+
+APP_DIR = Path(__file__).parent
+_MATCHER = _INDEX = None
+
+def _init_worker(cues_path: str):
+    global _MATCHER, _INDEX
+    _MATCHER = risk.build_matcher(load_json_safe(Path(cues_path), {}))
+    _INDEX = build_content(APP_DIR).get("suggest_index")
+
+def _score(rec: dict, field: str, llm=None) -> dict:
+    text = str(rec.get(field, ""))
+    hits = _MATCHER.scan(text)
+    level = risk.classify_risk(text, _MATCHER, llm) if llm is not None else risk.risk_from_hits(hits)
+    sug = risk.choose_suggestion(text, _MATCHER, _INDEX) if level < 2 else None
+    return {**rec, "risk": level, "cues": hits, "suggestion": sug["id"] if sug else None}
+
+def _score_keywords(args):
+    return _score(*args)
+
+def _records(lines, field):
+    for n, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line: continue
+        try:
+            rec = json.loads(line)
+        except json.JSONDecodeError:
+            print(f"line {n}: not JSON, skipped", file=sys.stderr); continue
+        yield rec if isinstance(rec, dict) else {field: rec}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("input", help="JSONL file of messages, or - for stdin")
+    ap.add_argument("-o", "--output", default="-", help="output JSONL (default stdout)")
+    ap.add_argument("--field", default="text", help="JSON key holding the message text")
+    ap.add_argument("--cues", default=str(APP_DIR / "content/cues.json"), help="extra cue file")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes for keyword mode")
+    ap.add_argument("--window", type=int, default=5000, help="messages in flight at once")
+    ap.add_argument("--llm", action="store_true", help="refine risk with Gemini (bounded concurrency)")
+    ap.add_argument("--concurrency", type=int, default=4, help="Gemini calls in flight in --llm mode")
+    ap.add_argument("--deadline", type=float, default=8.0, help="per-call Gemini deadline, seconds")
+    a = ap.parse_args(argv)
+
+    src = sys.stdin if a.input == "-" else open(a.input, encoding="utf-8")
+    dst = sys.stdout if a.output == "-" else open(a.output, "w", encoding="utf-8")
+    records = _records(src, a.field)
+    done, t0 = 0, time.perf_counter()
+
+    if a.llm:
+        from gemini import GeminiGateway
+        llm = GeminiGateway(os.getenv("GEMINI_API_KEY"), deadline_s=a.deadline, max_concurrency=a.concurrency)
+        if not llm.enabled:
+            print("GEMINI_API_KEY not set or google-genai missing; using keywords only", file=sys.stderr)
+        _init_worker(a.cues)
+        pool = ThreadPoolExecutor(max_workers=a.concurrency)
+        run = lambda batch: pool.map(lambda r: _score(r, a.field, llm), batch)
+    else:
+        pool = ProcessPoolExecutor(max_workers=a.workers, initializer=_init_worker, initargs=(a.cues,))
+        run = lambda batch: pool.map(_score_keywords, [(r, a.field) for r in batch],
+                                     chunksize=max(1, len(batch) // (a.workers * 4)))
+    with pool:
+        while batch := list(itertools.islice(records, a.window)):
+            for out in run(batch):
+                dst.write(json.dumps(out, ensure_ascii=False) + "\n")
+            done += len(batch)
+            dst.flush()
+    elapsed = time.perf_counter() - t0
+    print(f"{done} messages in {elapsed:.2f}s · {done / elapsed if elapsed else 0:.0f} msg/s"
+          + (f" · Gemini {llm.status()}" if a.llm else ""), file=sys.stderr)
+    if dst is not sys.stdout: dst.close()
+
+if __name__ == "__main__":
+    main()